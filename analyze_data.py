@@ -1,10 +1,30 @@
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
 import glob
 
+from grouping_master_io import read_master
+
 matplotlib.rcParams['font.family'] = 'MS Gothic'
 
+# =============================================================================
+# 設定値（ここを変更するとプログラム全体に反映されます）
+# =============================================================================
+
+# グルーピングマスタを使ってマーチャントグループ（keyword）単位でも集計する
+# - True にすると表記ゆれのある店名を1グループにまとめてランキング・推移・構成比を表示
+# - マスタにない店名はその店名だけのグループとして扱う
+USE_GROUPING_MASTER = False
+
+# グルーピングマスタのパス（.csv / .parquet / 検索用ディレクトリ（*_lookup）のいずれも指定可）
+GROUPING_MASTER_PATH = 'output/merchant_grouping_master.csv'
+
+# ランキング・グループ別グラフに表示するグループ数
+TOP_N_GROUPS = 10
+
+# =============================================================================
+
 # 複数CSVファイルを読み込む（24277〜24300）
 csv_files = sorted(glob.glob('data/monthly-individual-merchant-profile-vectors-v02-2x2/2*.csv'))
 dfs = []
@@ -31,6 +51,52 @@ df_monthly = df.groupby('Period').agg({
     'Value by Payment Method (In-person)': 'sum',
 }).reset_index()
 
+# === マーチャントグループの整数ID化 ===
+# 店名をカテゴリ化し、ユニーク店名ごとに1回だけマスタを引いて keyword の整数IDに変換する。
+# 以降の集計は整数IDの bincount で行い、文字列ラベルは描画時にだけ付ける。
+if USE_GROUPING_MASTER:
+    master = read_master(GROUPING_MASTER_PATH, columns=['keyword', 'merchant_name'])
+    master = master.dropna().drop_duplicates('merchant_name')
+    keyword_ids, keyword_labels = pd.factorize(master['keyword'])
+    name_to_group = dict(zip(master['merchant_name'], keyword_ids))
+
+    merchant_names = df['Merchant Name'].astype('category')
+    categories = merchant_names.cat.categories
+    category_group = np.fromiter((name_to_group.get(name, -1) for name in categories),
+                                 dtype=np.int64, count=len(categories))
+    # マスタにない店名はそれぞれ単独のグループにする
+    unmatched = category_group < 0
+    category_group[unmatched] = len(keyword_labels) + np.arange(unmatched.sum())
+    group_labels = np.concatenate([np.asarray(keyword_labels, dtype=object),
+                                   np.asarray(categories[unmatched], dtype=object)])
+
+    merchant_codes = merchant_names.cat.codes.to_numpy()
+    has_merchant = merchant_codes >= 0
+    group_ids = category_group[merchant_codes[has_merchant]]
+    group_count = len(group_labels)
+
+    def group_sum(column, ids=group_ids, mask=has_merchant, minlength=group_count):
+        """グループID単位の合計（bincount）"""
+        weights = df[column].fillna(0).to_numpy(dtype=np.float64)[mask]
+        return np.bincount(ids, weights=weights, minlength=minlength)
+
+    group_value = group_sum('Value')
+    top_groups = np.argsort(-group_value, kind='stable')[:TOP_N_GROUPS]
+
+    # 上位グループだけを 0..N-1 に詰め直して Period×グループ の推移を求める
+    rank_of_group = np.full(group_count, -1, dtype=np.int64)
+    rank_of_group[top_groups] = np.arange(len(top_groups))
+    group_rank = rank_of_group[group_ids]
+    in_top = group_rank >= 0
+    periods, period_codes = np.unique(df['Period'].to_numpy()[has_merchant], return_inverse=True)
+    trend_index = period_codes[in_top] * len(top_groups) + group_rank[in_top]
+    top_mask = has_merchant.copy()
+    top_mask[has_merchant] = in_top
+    group_monthly_value = group_sum('Value', trend_index, top_mask, len(periods) * len(top_groups)).reshape(
+        len(periods), len(top_groups))
+
+    print(f"マーチャントグループ数: {group_count:,}（マスタ一致 {len(keyword_labels):,} / 単独 {unmatched.sum():,}）")
+
 # 4x3のグリッドレイアウトを作成
 fig, axes = plt.subplots(4, 3, figsize=(16, 16))
 fig.suptitle(f'マーチャント取引データ分析（Period: {df["Period"].min()}〜{df["Period"].max()}）', fontsize=16)
@@ -150,11 +216,63 @@ ax11.set_ylabel('取引額')
 
 # 12. マーチャント別取引額ランキング（横棒グラフ）
 ax12 = axes[3, 2]
-merchant_total = df.groupby('Merchant Name')['Value'].sum().nlargest(10)
-ax12.barh(merchant_total.index, merchant_total.values, color='teal')
-ax12.set_title('取引額TOP10マーチャント')
+if USE_GROUPING_MASTER:
+    ax12.barh(group_labels[top_groups], group_value[top_groups], color='teal')
+    ax12.set_title(f'取引額TOP{len(top_groups)}マーチャントグループ')
+else:
+    merchant_total = df.groupby('Merchant Name')['Value'].sum().nlargest(10)
+    ax12.barh(merchant_total.index, merchant_total.values, color='teal')
+    ax12.set_title('取引額TOP10マーチャント')
 ax12.set_xlabel('取引額')
 ax12.invert_yaxis()
 
 plt.tight_layout()
 plt.show()
+
+# === マーチャントグループ別グラフ（3種） ===
+if USE_GROUPING_MASTER:
+    top_labels = group_labels[top_groups]
+    fig, axes = plt.subplots(1, 3, figsize=(18, 6))
+    fig.suptitle(f'マーチャントグループ分析（取引額上位{len(top_groups)}グループ）', fontsize=16)
+
+    # 1. グループ別の月別取引額推移
+    ax = axes[0]
+    for rank, label in enumerate(top_labels):
+        ax.plot(periods, group_monthly_value[:, rank], marker='o', linewidth=1.5, label=label)
+    ax.set_title('グループ別 月別取引額推移')
+    ax.set_xlabel('Period')
+    ax.set_ylabel('取引額')
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.legend(fontsize=8)
+
+    # 2. グループ別の決済方法構成比（100%積み上げ横棒）
+    ax = axes[1]
+    payment_columns = ['Value by Payment Method (Online)', 'Value by Payment Method (In-person)',
+                       'Value by Payment Method (Unknown)']
+    payment_share = np.stack([group_sum(col)[top_groups] for col in payment_columns], axis=1)
+    payment_share = payment_share / np.maximum(payment_share.sum(axis=1, keepdims=True), 1)
+    left = np.zeros(len(top_groups))
+    for share, label, color in zip(payment_share.T, payment_labels, colors_payment):
+        ax.barh(top_labels, share * 100, left=left, color=color, label=label)
+        left += share * 100
+    ax.set_title('グループ別 決済方法別取引額構成比')
+    ax.set_xlabel('構成比 (%)')
+    ax.invert_yaxis()
+    ax.legend(fontsize=8)
+
+    # 3. グループ別の性別構成比（100%積み上げ横棒）
+    ax = axes[2]
+    gender_columns = ['#Users by Gender (Male)', '#Users by Gender (Female)', '#Users by Gender (Unknown)']
+    gender_share = np.stack([group_sum(col)[top_groups] for col in gender_columns], axis=1)
+    gender_share = gender_share / np.maximum(gender_share.sum(axis=1, keepdims=True), 1)
+    left = np.zeros(len(top_groups))
+    for share, label, color in zip(gender_share.T, gender_labels, colors_gender):
+        ax.barh(top_labels, share * 100, left=left, color=color, label=label)
+        left += share * 100
+    ax.set_title('グループ別 性別構成比')
+    ax.set_xlabel('構成比 (%)')
+    ax.invert_yaxis()
+    ax.legend(fontsize=8)
+
+    plt.tight_layout()
+    plt.show()
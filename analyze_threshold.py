@@ -1,12 +1,16 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from grouping_master_io import read_master
+
 # 日本語フォント設定
 plt.rcParams['font.family'] = 'MS Gothic'
 
-# CSVを読み込み
-df = pd.read_csv('output/merchant_grouping_master.csv')
+# マスタのパス（.csv / .parquet / 検索用ディレクトリ（*_lookup）のいずれも指定可）
+MASTER_PATH = 'output/merchant_grouping_master.csv'
+
+# マスタを読み込み（集計に使う列だけを型指定で読む）
+df = read_master(MASTER_PATH, columns=['keyword', 'count'])
 
 # keywordごとのcount合計を計算し、降順にソート
 group_counts = df.groupby('keyword')['count'].sum().sort_values(ascending=False)
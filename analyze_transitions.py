@@ -0,0 +1,217 @@
+import glob
+import numpy as np
+import pandas as pd
+
+from profile_vector_schema import column_names, column_dtypes, cell_columns
+
+# =============================================================================
+# 設定値（ここを変更するとプログラム全体に反映されます）
+# =============================================================================
+
+# 遷移の重みに使う列（取引額）
+WEIGHT_COLUMN = 'Value'
+
+# 表示する「セル変化回数の多いマーチャント」の件数
+TOP_MERCHANTS = 10
+
+# =============================================================================
+
+CELL_COLUMN, PREV_CELL_COLUMN = cell_columns
+
+# 遷移ごとのCDF変化を集計する列の組（当月, 前月）
+CDF_COLUMN_PAIRS = [
+    ('CDF VT(i)', 'Prev. CDF VT(i)'),
+    ('CDF #Trans.(j)', 'Prev. CDF #Trans.(j)'),
+]
+
+# セルが欠損している場合のラベル
+MISSING_CELL_LABEL = '欠損'
+
+# 遷移分析で読み込む列
+TRANSITION_COLUMNS = ['Period', 'Merchant ID', 'Merchant Name', WEIGHT_COLUMN, CELL_COLUMN, PREV_CELL_COLUMN] \
+    + [col for pair in CDF_COLUMN_PAIRS for col in pair]
+
+
+def load_profile_vectors(csv_files, columns=TRANSITION_COLUMNS):
+    """プロファイルベクトルを必要な列だけ型指定で読み込む"""
+    dtypes = {col: column_dtypes[col] for col in columns}
+    dfs = [
+        pd.read_csv(csv_file, encoding='utf-8-sig', header=0, names=column_names, usecols=columns, dtype=dtypes)
+        for csv_file in csv_files
+    ]
+    return pd.concat(dfs, ignore_index=True)
+
+
+def encode_cells(df):
+    """当月・前月のセルを共通の小さな整数コードに変換する
+
+    両列に現れるセルを昇順に 0, 1, ... とし、欠損は最後のコードにまとめる。
+
+    Returns:
+        (前月コード, 当月コード, ラベルリスト)
+    """
+    prev_values = df[PREV_CELL_COLUMN].astype('string')
+    cur_values = df[CELL_COLUMN].astype('string')
+    labels = sorted(set(prev_values.dropna().unique()) | set(cur_values.dropna().unique()))
+    categories = pd.CategoricalDtype(labels)
+
+    missing_code = len(labels)
+    prev_codes = prev_values.astype(categories).cat.codes.to_numpy(dtype=np.int64)
+    cur_codes = cur_values.astype(categories).cat.codes.to_numpy(dtype=np.int64)
+    prev_codes[prev_codes < 0] = missing_code
+    cur_codes[cur_codes < 0] = missing_code
+
+    return prev_codes, cur_codes, labels + [MISSING_CELL_LABEL]
+
+
+def transition_matrices(df, weight_column=WEIGHT_COLUMN):
+    """Period別の前月→当月セル遷移行列を一括で計算する
+
+    (Period, 前月セル, 当月セル) を1つの整数に符号化し、bincount 1回で
+    全Periodの件数・取引額・CDF変化を集計する。
+
+    Returns:
+        {
+            'periods': Period の配列（P）,
+            'labels': セルのラベル（K）,
+            'counts': 遷移件数 [P, K, K]（[p, 前月, 当月]）,
+            'values': 遷移した取引額の合計 [P, K, K],
+            'cdf_changes': {CDF列名: 平均CDF変化 [P, K, K]（件数0はNaN）},
+        }
+    """
+    prev_codes, cur_codes, labels = encode_cells(df)
+    periods, period_codes = np.unique(df['Period'].to_numpy(), return_inverse=True)
+    k = len(labels)
+    shape = (len(periods), k, k)
+    size = len(periods) * k * k
+
+    flat = (period_codes * k + prev_codes) * k + cur_codes
+    counts = np.bincount(flat, minlength=size).reshape(shape)
+    weights = df[weight_column].fillna(0).to_numpy(dtype=np.float64)
+    values = np.bincount(flat, weights=weights, minlength=size).reshape(shape)
+
+    cdf_changes = {}
+    for cur_col, prev_col in CDF_COLUMN_PAIRS:
+        if cur_col not in df.columns or prev_col not in df.columns:
+            continue
+        delta = (df[cur_col] - df[prev_col]).to_numpy(dtype=np.float64)
+        valid = ~np.isnan(delta)
+        delta_sum = np.bincount(flat[valid], weights=delta[valid], minlength=size).reshape(shape)
+        delta_count = np.bincount(flat[valid], minlength=size).reshape(shape)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cdf_changes[cur_col] = delta_sum / delta_count
+
+    return {
+        'periods': periods,
+        'labels': labels,
+        'counts': counts,
+        'values': values,
+        'cdf_changes': cdf_changes,
+    }
+
+
+def transition_rates(counts):
+    """遷移件数を前月セルごとの遷移確率（行方向の割合）に変換する"""
+    totals = counts.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(totals > 0, counts / np.maximum(totals, 1), 0.0)
+
+
+def matrix_to_frame(matrix, labels):
+    """K×K 行列を 前月セル×当月セル の DataFrame にする"""
+    return pd.DataFrame(matrix, index=pd.Index(labels, name='前月セル'), columns=pd.Index(labels, name='当月セル'))
+
+
+def merchant_transition_history(df):
+    """マーチャントごとのセル遷移履歴を作成する
+
+    Merchant ID・Period 順に並べ替えた整数コードから、1回の走査で
+    各マーチャントの遷移列と変化回数を求める。
+
+    Returns:
+        (history, summary)
+        history: Merchant ID / Period / 前月セル / 当月セル / 変化 の DataFrame（Period順）
+        summary: マーチャントごとの Merchant Name / Period数 / 変化回数 / 初回セル / 最終セル / 遷移経路
+    """
+    prev_codes, cur_codes, labels = encode_cells(df)
+    merchant_ids, merchant_codes = np.unique(df['Merchant ID'].astype(str).to_numpy(), return_inverse=True)
+    order = np.lexsort((df['Period'].to_numpy(), merchant_codes))
+
+    sorted_merchants = merchant_codes[order]
+    sorted_prev = prev_codes[order]
+    sorted_cur = cur_codes[order]
+    changed = sorted_prev != sorted_cur
+    label_array = np.asarray(labels, dtype=object)
+
+    history = pd.DataFrame({
+        'Merchant ID': merchant_ids[sorted_merchants],
+        'Period': df['Period'].to_numpy()[order],
+        '前月セル': label_array[sorted_prev],
+        '当月セル': label_array[sorted_cur],
+        '変化': changed,
+    })
+
+    # マーチャントの境界（sorted_merchants が切り替わる位置）
+    starts = np.flatnonzero(np.r_[True, sorted_merchants[1:] != sorted_merchants[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+    paths = [
+        '→'.join(label_array[np.r_[sorted_prev[s], sorted_cur[s:e]]])
+        for s, e in zip(starts, ends)
+    ]
+    names = df['Merchant Name'].astype(str).to_numpy()[order] if 'Merchant Name' in df.columns else None
+
+    summary = pd.DataFrame({
+        'Merchant ID': merchant_ids[sorted_merchants[starts]],
+        'Merchant Name': names[ends - 1] if names is not None else None,
+        'Period数': ends - starts,
+        '変化回数': np.add.reduceat(changed.astype(np.int64), starts) if len(starts) else [],
+        '初回セル': label_array[sorted_prev[starts]],
+        '最終セル': label_array[sorted_cur[ends - 1]],
+        '遷移経路': paths,
+    })
+
+    return history, summary
+
+
+def main():
+    csv_files = sorted(glob.glob('data/monthly-individual-merchant-profile-vectors-v02-2x2/2*.csv'))
+
+    print("=" * 60)
+    print("2DRセル遷移分析")
+    print("=" * 60)
+    print(f"対象ファイル数: {len(csv_files)} 件")
+
+    df = load_profile_vectors(csv_files)
+    print(f"総レコード数: {len(df):,}")
+    print(f"Period範囲: {df['Period'].min()} 〜 {df['Period'].max()}")
+    print()
+
+    result = transition_matrices(df)
+    labels = result['labels']
+
+    pd.set_option('display.width', None)
+    print("=== 全期間の遷移件数（前月セル → 当月セル） ===")
+    print(matrix_to_frame(result['counts'].sum(axis=0), labels))
+    print()
+    print("=== 全期間の遷移確率 ===")
+    print(matrix_to_frame(transition_rates(result['counts'].sum(axis=0)), labels).round(3))
+    print()
+    print(f"=== 全期間の遷移取引額（{WEIGHT_COLUMN}） ===")
+    print(matrix_to_frame(result['values'].sum(axis=0), labels))
+    print()
+
+    print("=== Period別のセル変化率 ===")
+    for period, counts in zip(result['periods'], result['counts']):
+        total = counts.sum()
+        stay = np.trace(counts)
+        if total:
+            print(f"  {period}: {total:,} 件中 {total - stay:,} 件が変化（{(total - stay) / total * 100:.1f}%）")
+    print()
+
+    history, summary = merchant_transition_history(df)
+    print(f"=== セル変化回数の多いマーチャント（上位{TOP_MERCHANTS}件） ===")
+    print(summary.nlargest(TOP_MERCHANTS, '変化回数').to_string(index=False))
+
+
+# Jupyter Notebookで実行する場合は main() を呼び出してください
+# main()
@@ -0,0 +1,301 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+import statistics
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from profile_vector_schema import column_names
+
+# =============================================================================
+# 設定値（ここを変更するとプログラム全体に反映されます）
+# =============================================================================
+
+# 合成データの乱数シード（同じ値なら同じデータが生成される）
+BENCH_SEED = 0
+
+# 生成するファイル数（1ファイル = 1 Period）
+BENCH_FILE_COUNT = 12
+
+# 1ファイルあたりの行数
+BENCH_ROWS_PER_FILE = 20000
+
+# 各スクリプトの計測回数（中央値を記録）
+BENCH_REPEAT = 3
+
+# 計測対象のスクリプト
+BENCH_SCRIPTS = ['count_csv.py', 'show_dataframe.py', 'analyze_data.py', 'analyze_threshold.py']
+
+# 計測結果の履歴ファイル
+BENCH_HISTORY_PATH = 'output/bench_history.json'
+
+# =============================================================================
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = 'data/monthly-individual-merchant-profile-vectors-v02-2x2'
+FIRST_PERIOD = 24277
+
+# 店名の元になるチェーン名と店舗名の接尾辞（表記ゆれを含む）
+CHAIN_NAMES = ['セブン-イレブン', 'セブンイレブン', 'ファミリーマート', 'ﾌｧﾐﾘｰﾏｰﾄ', 'ローソン',
+               'スターバックス', 'マクドナルド', 'ＡＭＡＺＯＮ', 'Amazon', 'ユニクロ']
+BRANCH_NAMES = ['渋谷店', '新宿店', '千代田店', '品川駅前店', '梅田東口店', '博多店', '札幌店']
+CELL_LABELS = ['(1,1)', '(1,2)', '(2,1)', '(2,2)']
+
+# 子プロセスで各スクリプトを実行し、読み込み・描画の時間を計測するハーネス
+# - 読み込み: pd.read_csv / pd.read_parquet の実行時間
+# - 読み込みバイト数: スクリプト実行中に read 系システムコールで実際に読んだバイト数
+#   （/proc/self/io の rchar。ない環境では psutil。ページキャッシュからの読み込みや
+#    スクリプト内の import も含む。どちらも使えない場合は記録しない）
+# - 描画: print と、plt.show での各図の canvas.draw（Aggで描画）の時間
+#   （図を作る間の集計やプロット呼び出しは集計に含める）
+# - 集計: 全体から読み込み・描画を引いた残り
+HARNESS = r'''
+import builtins, json, os, runpy, sys, time
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pandas as pd
+
+script_path, result_path = sys.argv[1], sys.argv[2]
+stats = {'load_seconds': 0.0, 'render_seconds': 0.0}
+
+def timed_reader(reader):
+    def wrapper(path, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return reader(path, *args, **kwargs)
+        finally:
+            stats['load_seconds'] += time.perf_counter() - start
+    return wrapper
+
+def read_chars():
+    try:
+        with open('/proc/self/io', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import psutil
+        counters = psutil.Process().io_counters()
+        return getattr(counters, 'read_chars', counters.read_bytes)
+    except (ImportError, AttributeError):
+        return None
+
+pd.read_csv = timed_reader(pd.read_csv)
+pd.read_parquet = timed_reader(pd.read_parquet)
+
+devnull = open(os.devnull, 'w', encoding='utf-8')
+original_print = builtins.print
+def timed_print(*args, **kwargs):
+    start = time.perf_counter()
+    kwargs['file'] = devnull
+    original_print(*args, **kwargs)
+    stats['render_seconds'] += time.perf_counter() - start
+builtins.print = timed_print
+sys.stdout = devnull
+
+def timed_show(*args, **kwargs):
+    start = time.perf_counter()
+    for num in plt.get_fignums():
+        plt.figure(num).canvas.draw()
+    stats['render_seconds'] += time.perf_counter() - start
+    plt.close('all')
+plt.show = timed_show
+
+chars_before = read_chars()
+start = time.perf_counter()
+runpy.run_path(script_path, run_name='__main__')
+stats['total_seconds'] = time.perf_counter() - start
+chars_after = read_chars()
+stats['bytes_read'] = chars_after - chars_before if chars_before is not None and chars_after is not None else None
+stats['aggregate_seconds'] = max(stats['total_seconds'] - stats['load_seconds'] - stats['render_seconds'], 0.0)
+
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS は bytes 単位
+    stats['peak_rss_bytes'] = peak if sys.platform == 'darwin' else peak * 1024
+except ImportError:
+    try:
+        import psutil
+        stats['peak_rss_bytes'] = psutil.Process().memory_info().peak_wset
+    except (ImportError, AttributeError):
+        stats['peak_rss_bytes'] = None
+
+with open(result_path, 'w', encoding='utf-8') as f:
+    json.dump(stats, f)
+'''
+
+
+def generate_profile_vectors(output_dir, file_count=BENCH_FILE_COUNT, rows_per_file=BENCH_ROWS_PER_FILE,
+                             seed=BENCH_SEED):
+    """show_dataframe.column_names と同じ45列の合成プロファイルベクトルを生成する
+
+    output_dir 以下に実データと同じ配置（data/monthly-.../2*.csv）で出力し、
+    analyze_threshold.py 用の合成マスタ（output/merchant_grouping_master.csv）も出力する。
+
+    Returns:
+        生成したCSVファイルのパスリスト
+    """
+    rng = np.random.default_rng(seed)
+    profile_dir = os.path.join(output_dir, PROFILE_DIR)
+    os.makedirs(profile_dir, exist_ok=True)
+
+    merchant_pool = [f'{chain} {branch}' if i % 2 else f'{chain}{branch}'
+                     for i, (chain, branch) in enumerate(
+                         (c, b) for c in CHAIN_NAMES for b in BRANCH_NAMES)]
+    merchant_pool += [f'個人商店{i:05d}' for i in range(max(rows_per_file - len(merchant_pool), 0))]
+    merchant_ids = np.arange(len(merchant_pool)) + 100000
+    numeric_columns = column_names[4:]
+
+    paths = []
+    for file_index in range(file_count):
+        period = FIRST_PERIOD + file_index
+        year, month = divmod(period - 1, 12)
+        picks = rng.choice(len(merchant_pool), size=rows_per_file, replace=rows_per_file > len(merchant_pool))
+
+        data = {
+            'Period': np.full(rows_per_file, period),
+            'Date': np.full(rows_per_file, f'{year}-{month + 1:02d}-01'),
+            'Merchant ID': merchant_ids[picks],
+            'Merchant Name': np.asarray(merchant_pool, dtype=object)[picks],
+        }
+        for col in numeric_columns:
+            if 'Cell' in col:
+                data[col] = rng.choice(CELL_LABELS, size=rows_per_file)
+            elif col.startswith(('Avg.', 'Std.', 'CDF', 'Prev. CDF', 'Value /')):
+                data[col] = rng.random(rows_per_file).round(4)
+            else:
+                data[col] = rng.integers(0, 10000, size=rows_per_file)
+
+        path = os.path.join(profile_dir, f'{period}.csv')
+        pd.DataFrame(data, columns=column_names).to_csv(path, index=False, encoding='utf-8-sig')
+        paths.append(path)
+
+    # analyze_threshold.py 用の合成マスタ
+    master_dir = os.path.join(output_dir, 'output')
+    os.makedirs(master_dir, exist_ok=True)
+    counts = rng.zipf(1.5, size=len(merchant_pool)).clip(max=10**6)
+    keywords = [name.split(' ')[0][:6] for name in merchant_pool]
+    pd.DataFrame({'keyword': keywords, 'merchant_name': merchant_pool, 'count': counts}).to_csv(
+        os.path.join(master_dir, 'merchant_grouping_master.csv'), index=False, encoding='utf-8-sig')
+
+    return paths
+
+
+def run_script(script, work_dir):
+    """子プロセスでスクリプトを1回実行して計測結果を返す"""
+    result_path = os.path.join(work_dir, 'bench_result.json')
+    env = dict(os.environ, MPLBACKEND='Agg',
+               PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')])))
+    subprocess.run([sys.executable, '-c', HARNESS, os.path.join(REPO_DIR, script), result_path],
+                   cwd=work_dir, env=env, check=True)
+    with open(result_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def git_commit():
+    """計測時点のコミットID（git がなければ None）"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scripts=BENCH_SCRIPTS, file_count=BENCH_FILE_COUNT, rows_per_file=BENCH_ROWS_PER_FILE,
+                   repeat=BENCH_REPEAT, seed=BENCH_SEED, work_dir=None):
+    """合成データを生成して各スクリプトを計測する
+
+    Returns:
+        履歴ファイルに追記する1件分の記録（各指標は repeat 回の中央値）
+    """
+    cleanup = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='bench_loaders_')
+    try:
+        print(f"合成データ生成中: {file_count} ファイル × {rows_per_file:,} 行")
+        paths = generate_profile_vectors(work_dir, file_count, rows_per_file, seed)
+        data_bytes = sum(os.path.getsize(p) for p in paths)
+
+        results = {}
+        for script in scripts:
+            runs = []
+            for i in range(repeat):
+                print(f"計測中: {script} ({i + 1}/{repeat})")
+                runs.append(run_script(script, work_dir))
+            results[script] = {
+                key: statistics.median(run[key] for run in runs) if runs[0][key] is not None else None
+                for key in runs[0]
+            }
+    finally:
+        if cleanup:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'params': {'file_count': file_count, 'rows_per_file': rows_per_file, 'repeat': repeat,
+                   'seed': seed, 'data_bytes': data_bytes},
+        'results': results,
+    }
+
+
+def append_history(record, history_path=BENCH_HISTORY_PATH):
+    """計測結果を履歴ファイル（JSON配列）に追記し、追記前の履歴を返す"""
+    history = []
+    if os.path.exists(history_path):
+        with open(history_path, encoding='utf-8') as f:
+            history = json.load(f)
+    os.makedirs(os.path.dirname(history_path), exist_ok=True)
+    with open(history_path, 'w', encoding='utf-8') as f:
+        json.dump(history + [record], f, ensure_ascii=False, indent=2)
+    return history
+
+
+def print_report(record, previous=None):
+    """計測結果を表示する（同じ条件の前回結果があれば比較も表示）"""
+    print("=" * 60)
+    print(f"I/O・集計ベンチマーク（commit: {record['commit']}）")
+    print("=" * 60)
+    params = record['params']
+    print(f"データ: {params['file_count']} ファイル × {params['rows_per_file']:,} 行"
+          f"（{params['data_bytes'] / 1024**2:,.1f} MB）")
+    print()
+    for script, result in record['results'].items():
+        rss = result['peak_rss_bytes']
+        rss_text = f"{rss / 1024**2:,.0f} MB" if rss is not None else "不明"
+        print(f"【{script}】")
+        print(f"  合計: {result['total_seconds']:.3f} 秒"
+              f"（読み込み {result['load_seconds']:.3f} / 集計 {result['aggregate_seconds']:.3f}"
+              f" / 描画 {result['render_seconds']:.3f}）")
+        bytes_read = result.get('bytes_read')
+        bytes_text = f"{bytes_read / 1024**2:,.2f} MB" if bytes_read is not None else "不明"
+        print(f"  ピークRSS: {rss_text}  読み込みバイト数: {bytes_text}")
+        if previous and script in previous['results']:
+            before = previous['results'][script]['total_seconds']
+            print(f"  前回比（commit: {previous['commit']}）: {before:.3f} 秒 → {result['total_seconds']:.3f} 秒"
+                  f"（{(result['total_seconds'] / before - 1) * 100:+.1f}%）")
+
+
+def main():
+    record = run_benchmarks()
+    history = append_history(record)
+
+    # 同じ条件で計測した直近の結果と比較する
+    previous = next((r for r in reversed(history) if r['params'] == record['params']), None)
+    print_report(record, previous)
+    print()
+    print(f"履歴ファイル: {BENCH_HISTORY_PATH}")
+
+
+if __name__ == '__main__':
+    main()
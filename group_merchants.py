@@ -3,10 +3,19 @@ import glob
 import os
 import unicodedata
 import re
+import random
+import time
+import pickle
+import hashlib
+from array import array
 from collections import Counter
 from difflib import SequenceMatcher
 from IPython.display import clear_output
 
+from similarity_scorer import get_scorer
+from grouping_master_io import write_master
+from japanese_normalizer import get_normalizer
+
 # =============================================================================
 # 設定値（ここを変更するとプログラム全体に反映されます）
 # =============================================================================
@@ -17,6 +26,45 @@ from IPython.display import clear_output
 # - 高くすると厳密（グループが細かくなる）、低くすると緩やか（グループが大きくなる）
 SIMILARITY_THRESHOLD = 0.8
 
+# 類似度の計算方式
+# - 'sequence_matcher': calc_similarity と完全に同じ値（既定）
+# - 'bitparallel_lcs': NumPyによるビット並列LCS（高速だが値はやや高めに出る近似）
+SIMILARITY_SCORER = 'sequence_matcher'
+
+# 店名の正規化方式
+# - 'basic': NFKC正規化・小文字化のみ（既定。既存マスタのkeywordと互換）
+# - 'japanese': さらにカタカナ→ひらがな、ハイフン・中黒・空白と末尾の長音の除去、
+#               店舗接尾辞（japanese_normalizer.STORE_SUFFIXES）の除去を行う
+#               （接尾辞は区切り・数字・文字種の変わり目の直後にあるときだけ除去し、
+#               「百貨店」など japanese_normalizer.SUFFIX_EXCEPTIONS の語は残す）
+NORMALIZATION_MODE = 'basic'
+
+# マスタの出力形式（複数指定可）
+# - 'csv': Excelでの手動修正用（既定）
+# - 'parquet': keyword / merchant_name を辞書エンコードしたParquet（要 pyarrow）
+# - 'lookup': メモリマップで開ける検索用ディレクトリ（grouping_master_io.MasterLookup で開く）
+OUTPUT_FORMATS = ['csv']
+
+# 代表名選定・キーワード抽出の並列プロセス数
+# - 0 または 1: 逐次実行（既定）
+# - 2以上: グループ単位でプロセスプールに分散（結果は逐次実行と同じ）
+PARALLEL_WORKERS = 0
+
+# 正規化後に同じ文字列になる店名をまとめてからグルーピングする
+# - True: 正規化キー単位でグルーピング・代表名選定を行い、出力時に元の店名へ展開する（既定）
+# - False: 元の店名を1件ずつグルーピングする
+DEDUPE_NORMALIZED = True
+
+# グルーピング途中の状態を保存するチェックポイント
+# - CHECKPOINT_INTERVAL 秒ごとに CHECKPOINT_PATH へ保存する（0 で保存しない）
+# - group_merchants(..., resume=True) で最後のチェックポイントから再開する
+# - 正常に完了すると、同じ入力・設定のチェックポイントは削除される（別の入力・設定のものは残る）
+CHECKPOINT_PATH = 'output/group_merchants.checkpoint'
+CHECKPOINT_INTERVAL = 300
+
+# main() で前回中断したチェックポイントから再開するか
+RESUME_FROM_CHECKPOINT = False
+
 # =============================================================================
 
 
@@ -24,6 +72,8 @@ def normalize_text(text):
     """テキストを正規化する（表記ゆれ統一）"""
     if pd.isna(text):
         return ""
+    if NORMALIZATION_MODE == 'japanese':
+        return get_normalizer()(text)
     text = str(text).strip()
     # NFKC正規化：全角英数字→半角、半角カタカナ→全角
     text = unicodedata.normalize('NFKC', text)
@@ -32,17 +82,33 @@ def normalize_text(text):
     return text
 
 
+def normalize_texts(texts):
+    """複数のテキストをまとめて正規化する（同じ文字列は1回だけ正規化）"""
+    if NORMALIZATION_MODE == 'japanese':
+        return get_normalizer().normalize_batch(texts)
+    cache = {}
+    result = []
+    for text in texts:
+        if text not in cache:
+            cache[text] = normalize_text(text)
+        result.append(cache[text])
+    return result
+
+
 def calc_similarity(str1, str2):
     """2つの文字列の類似度を計算（0.0〜1.0）"""
     return SequenceMatcher(None, str1, str2).ratio()
 
 
-def select_best_representative(members, normalized_cache=None):
+def select_best_representative(members, normalized_cache=None, scorer=None, rng=None, weights=None):
     """グループ内で最も他メンバーと類似度が高い店名を代表として選ぶ
 
     Args:
         members: メンバーリスト
         normalized_cache: 正規化済み文字列のキャッシュ {原文: 正規化文字列}
+        scorer: 類似度スコアラー（省略時は SIMILARITY_SCORER）
+        rng: サンプリングに使う乱数（省略時は random モジュール）
+        weights: 各メンバーの重み {メンバー: 件数}（正規化キーにまとめた元の店名の数。省略時は1）
     """
     if len(members) <= 1:
         return members[0] if members else ""
@@ -50,8 +116,7 @@ def select_best_representative(members, normalized_cache=None):
     # 大きなグループはサンプリングして計算量を削減
     MAX_SAMPLE = 50
     if len(members) > MAX_SAMPLE:
-        import random
-        sample_members = random.sample(members, MAX_SAMPLE)
+        sample_members = (rng or random).sample(members, MAX_SAMPLE)
     else:
         sample_members = members
 
@@ -61,16 +126,26 @@ def select_best_representative(members, normalized_cache=None):
             return normalized_cache[text]
         return normalize_text(text)
 
+    if scorer is None:
+        scorer = get_scorer(SIMILARITY_SCORER)
+
+    # サンプル内の全ペアの類似度を一括計算
+    sample_norms = [get_normalized(m) for m in sample_members]
+    scores = scorer.many_vs_many(sample_norms, sample_norms)
+
+    def get_weight(member):
+        return weights.get(member, 1) if weights else 1
+
     best_rep = members[0]
     best_total_similarity = 0
 
-    for candidate in sample_members:
-        candidate_norm = get_normalized(candidate)
+    for i, candidate in enumerate(sample_members):
         # 他のメンバーとの類似度の合計を計算
+        # （同じキーにまとめた他の店名は類似度 1.0 として数える）
         total_similarity = sum(
-            calc_similarity(candidate_norm, get_normalized(other))
-            for other in sample_members if other != candidate
-        )
+            scores[i][j] * get_weight(other)
+            for j, other in enumerate(sample_members) if other != candidate
+        ) + (get_weight(candidate) - 1)
         if total_similarity > best_total_similarity:
             best_total_similarity = total_similarity
             best_rep = candidate
@@ -78,23 +153,149 @@ def select_best_representative(members, normalized_cache=None):
     return best_rep
 
 
-def group_merchants(merchant_names, threshold=SIMILARITY_THRESHOLD):
-    """店名を類似度でグルーピングする"""
+def collapse_normalized_keys(merchant_names, normalized_cache):
+    """店名を正規化キー単位にまとめる
+
+    Args:
+        merchant_names: 店名リスト
+        normalized_cache: 正規化済み文字列のキャッシュ {原文: 正規化文字列}
+
+    Returns:
+        {正規化キー: [元の店名リスト]}（キーは最初に現れた順、空のキーは除く）
+        代表名選定の重みには店名リストの件数を使い、出現回数はキー内の代表名を選ぶときだけ使う
+    """
+    keys = {}
+    for name in merchant_names:
+        key = normalized_cache[name]
+        if not key:
+            continue
+        keys.setdefault(key, []).append(name)
+    return keys
+
+
+def checkpoint_fingerprint(merchant_names, threshold):
+    """入力と結果に影響する設定から、チェックポイントの照合用ハッシュを作る"""
+    digest = hashlib.sha1()
+    digest.update(repr((threshold, SIMILARITY_SCORER, NORMALIZATION_MODE, DEDUPE_NORMALIZED)).encode('utf-8'))
+    for name in merchant_names:
+        digest.update(str(name).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def save_checkpoint(state, path=CHECKPOINT_PATH):
+    """チェックポイントを保存する（一時ファイルに書いてから置き換えるので途中で落ちても壊れない）
+
+    照合用ハッシュだけを先頭に別に書き、状態全体を読まずに確認できるようにする。
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state['fingerprint'], f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint_fingerprint(path=CHECKPOINT_PATH):
+    """チェックポイントの照合用ハッシュだけを読み込む（なければ None）"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def load_checkpoint(path=CHECKPOINT_PATH):
+    """チェックポイントを読み込む（なければ None）"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        pickle.load(f)  # 照合用ハッシュ（状態にも含まれる）
+        return pickle.load(f)
+
+
+def group_merchants(merchant_names, threshold=SIMILARITY_THRESHOLD, scorer=None, merchant_counts=None,
+                    resume=False):
+    """店名を類似度でグルーピングする
+
+    DEDUPE_NORMALIZED が True の場合は正規化キー単位でグルーピング・代表名選定を行い、
+    最後に各キーを元の店名に展開する（代表名はキー内で出現回数が最も多い店名）。
+
+    Args:
+        merchant_names: 店名リスト
+        threshold: 類似度の閾値
+        scorer: 類似度スコアラー（省略時は SIMILARITY_SCORER）
+        merchant_counts: 各店舗名の出現回数 Counter（代表名の選定に使う）
+        resume: True なら CHECKPOINT_PATH のチェックポイントから再開する
+                （入力・設定が異なるチェックポイントの場合は ValueError）
+    """
     groups = []  # [(代表名, 正規化名, [メンバーリスト]), ...]
+    rep_normalized_list = []  # 各グループの正規化代表名（スコアラーに一括で渡す）
     total = len(merchant_names)
 
-    # 正規化結果をキャッシュ（同じ文字列を何度も正規化しない）
-    normalized_cache = {}
+    if scorer is None:
+        scorer = get_scorer(SIMILARITY_SCORER)
 
-    for idx, name in enumerate(merchant_names):
-        # キャッシュを活用した正規化
-        if name in normalized_cache:
-            normalized = normalized_cache[name]
-        else:
-            normalized = normalize_text(name)
-            normalized_cache[name] = normalized
+    fingerprint = checkpoint_fingerprint(merchant_names, threshold)
+    checkpoint = load_checkpoint(CHECKPOINT_PATH) if resume else None
+    if resume and checkpoint is None:
+        print(f"警告: チェックポイント {CHECKPOINT_PATH} がないため最初から処理します")
+    if checkpoint is not None and checkpoint['fingerprint'] != fingerprint:
+        raise ValueError(f"チェックポイント {CHECKPOINT_PATH} は現在の入力・設定と異なるため再開できません")
+
+    # 全店名をまとめて正規化してキャッシュ（同じ文字列を何度も正規化しない）
+    if checkpoint is not None:
+        normalized_list = checkpoint['normalized']
+    else:
+        normalized_list = normalize_texts(merchant_names)
+    normalized_cache = dict(zip(merchant_names, normalized_list))
+
+    if DEDUPE_NORMALIZED:
+        normalized_keys = collapse_normalized_keys(merchant_names, normalized_cache)
+        print(f"正規化キー: {len(normalized_keys):,} 件（店名 {total:,} 件）")
+        items = list(normalized_keys)
+        # 以降はキーそのものを正規化済みの店名として扱う
+        item_normalized = {key: key for key in items}
+        item_weights = {key: len(variants) for key, variants in normalized_keys.items()}
+        total = len(items)
+    else:
+        items = merchant_names
+        item_normalized = normalized_cache
+        item_weights = None
+
+    # 各 item が入ったグループ番号（正規化後が空の場合は -1）
+    # グループは作成順・メンバーは item 順に並ぶので、この配列だけでグループを復元できる
+    assignment = array('i')
+    start_idx = 0
+    if checkpoint is not None:
+        assignment = checkpoint['assignment']
+        start_idx = len(assignment)
+        for name, group_index in zip(items, assignment):
+            if group_index < 0:
+                continue
+            if group_index == len(groups):
+                groups.append((name, item_normalized[name], [name]))
+                rep_normalized_list.append(item_normalized[name])
+            else:
+                groups[group_index][2].append(name)
+        print(f"チェックポイントから再開: {start_idx:,}/{total:,} - グループ数: {len(groups):,}")
+
+    last_checkpoint = time.perf_counter()
+
+    for idx in range(start_idx, len(items)):
+        name = items[idx]
+        normalized = item_normalized[name]
+
+        # 定期的にチェックポイントを保存（時刻の確認も100件ごと）
+        if CHECKPOINT_INTERVAL > 0 and idx % 100 == 0 and time.perf_counter() - last_checkpoint >= CHECKPOINT_INTERVAL:
+            save_checkpoint({
+                'fingerprint': fingerprint,
+                'normalized': normalized_list,
+                'assignment': assignment,
+            }, CHECKPOINT_PATH)
+            last_checkpoint = time.perf_counter()
 
         if not normalized:
+            assignment.append(-1)
             continue
 
         # 進捗表示（1000件ごと）
@@ -106,9 +307,8 @@ def group_merchants(merchant_names, threshold=SIMILARITY_THRESHOLD):
         matched_group = None
         max_similarity = 0
 
-        for i, (rep_name, rep_normalized, members) in enumerate(groups):
-            similarity = calc_similarity(normalized, rep_normalized)
-
+        similarities = scorer.one_vs_many(normalized, rep_normalized_list, threshold)
+        for i, similarity in enumerate(similarities):
             if similarity >= threshold and similarity > max_similarity:
                 max_similarity = similarity
                 matched_group = i
@@ -116,26 +316,53 @@ def group_merchants(merchant_names, threshold=SIMILARITY_THRESHOLD):
         if matched_group is not None:
             # 既存グループに追加
             groups[matched_group][2].append(name)
+            assignment.append(matched_group)
         else:
             # 新規グループ作成
+            assignment.append(len(groups))
             groups.append((name, normalized, [name]))
+            rep_normalized_list.append(normalized)
 
     clear_output(wait=True)
     print(f"グルーピング完了: {total:,}/{total:,} (100%) - グループ数: {len(groups):,}")
 
     # 各グループの代表名を再選定（最も他メンバーと類似する店名）
+    # サンプリングの乱数はグループ番号で初期化する（並列実行時も同じ代表名になる）
     print("代表名を再選定中...")
-    result = []
-    for i, (rep_name, rep_normalized, members) in enumerate(groups):
-        if i > 0 and i % 1000 == 0:
-            clear_output(wait=True)
-            print(f"代表名再選定中: {i:,}/{len(groups):,} ({i*100//len(groups)}%)")
-        best_rep = select_best_representative(members, normalized_cache)
-        result.append((best_rep, members))
+    if PARALLEL_WORKERS > 1:
+        from parallel_groups import compute_representatives
+        member_lists = [members for _, _, members in groups]
+        reps = compute_representatives(member_lists, item_normalized, PARALLEL_WORKERS,
+                                       SIMILARITY_SCORER, NORMALIZATION_MODE, weights=item_weights)
+        result = list(zip(reps, member_lists))
+    else:
+        result = []
+        for i, (rep_name, rep_normalized, members) in enumerate(groups):
+            if i > 0 and i % 1000 == 0:
+                clear_output(wait=True)
+                print(f"代表名再選定中: {i:,}/{len(groups):,} ({i*100//len(groups)}%)")
+            best_rep = select_best_representative(members, item_normalized, scorer, rng=random.Random(i),
+                                                  weights=item_weights)
+            result.append((best_rep, members))
+
+    # 正規化キーを元の店名に展開する
+    if DEDUPE_NORMALIZED:
+        counts = merchant_counts or {}
+        expanded = []
+        for best_key, keys in result:
+            variants = normalized_keys[best_key]
+            best_rep = max(variants, key=lambda name: counts.get(name, 0))
+            expanded.append((best_rep, [name for key in keys for name in normalized_keys[key]]))
+        result = expanded
 
     clear_output(wait=True)
     print(f"完了: {len(result):,} グループ")
 
+    # 正常に完了したので、同じ入力・設定のチェックポイントは不要
+    # （別の入力・設定で中断したチェックポイントは再開できるよう残す）
+    if read_checkpoint_fingerprint(CHECKPOINT_PATH) == fingerprint:
+        os.remove(CHECKPOINT_PATH)
+
     return result
 
 
@@ -170,13 +397,13 @@ def extract_common_keyword_from_group(members):
         return ""
 
     # 全メンバーを正規化
-    normalized_members = [normalize_text(m) for m in members if normalize_text(m)]
+    normalized_members = [n for n in normalize_texts(members) if n]
 
     if len(normalized_members) < 2:
         return ""
 
-    # 最長と最短の店舗名を取得
-    sorted_by_length = sorted(normalized_members, key=len)
+    # 最長と最短の店舗名を取得（同じ正規化文字列は1回だけ比較する）
+    sorted_by_length = sorted(dict.fromkeys(normalized_members), key=len)
     shortest = sorted_by_length[0]
     longest = sorted_by_length[-1]
 
@@ -199,7 +426,8 @@ def extract_common_keyword_from_group(members):
     return keyword if len(keyword) >= 2 else shortest[:10]
 
 
-def export_grouping_master(groups, merchant_counts, output_path='output/merchant_grouping_master.csv'):
+def export_grouping_master(groups, merchant_counts, output_path='output/merchant_grouping_master.csv',
+                           output_formats=None):
     """グルーピング結果をマスタCSVとして出力する
 
     出力形式:
@@ -212,20 +440,27 @@ def export_grouping_master(groups, merchant_counts, output_path='output/merchant
     Args:
         groups: グルーピング結果 [(代表名, [メンバーリスト]), ...]
         merchant_counts: 各店舗名の出現回数 Counter
-        output_path: 出力ファイルパス
+        output_path: 出力ファイルパス（CSV。他の形式は拡張子を置き換えたパスに出力）
+        output_formats: 出力形式のリスト（省略時は OUTPUT_FORMATS）
+
+    Returns:
+        ({形式: 実際に出力したパス}, 出力レコード数)
     """
     # 出力ディレクトリを作成
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-    rows = []
-    for group_name, members in groups:
-        # 1件のグループはスキップ
-        if len(members) < 2:
-            continue
+    # 1件のグループはスキップ
+    target_groups = [members for group_name, members in groups if len(members) >= 2]
 
-        # グループ内の店舗名から共通キーワードを抽出
-        keyword = extract_common_keyword_from_group(members)
+    # グループ内の店舗名から共通キーワードを抽出
+    if PARALLEL_WORKERS > 1:
+        from parallel_groups import compute_keywords
+        keywords = compute_keywords(target_groups, PARALLEL_WORKERS, NORMALIZATION_MODE)
+    else:
+        keywords = [extract_common_keyword_from_group(members) for members in target_groups]
 
+    rows = []
+    for members, keyword in zip(target_groups, keywords):
         for member in members:
             rows.append({
                 'keyword': keyword,
@@ -233,10 +468,10 @@ def export_grouping_master(groups, merchant_counts, output_path='output/merchant
                 'count': merchant_counts.get(member, 0)
             })
 
-    df = pd.DataFrame(rows)
-    df.to_csv(output_path, index=False, encoding='utf-8-sig')
+    df = pd.DataFrame(rows, columns=['keyword', 'merchant_name', 'count'])
+    paths = write_master(df, output_path, output_formats or OUTPUT_FORMATS)
 
-    return output_path, len(rows)
+    return paths, len(rows)
 
 
 def main():
@@ -265,7 +500,8 @@ def main():
     print()
 
     # グルーピング実行
-    groups = group_merchants(merchant_list, SIMILARITY_THRESHOLD)
+    groups = group_merchants(merchant_list, SIMILARITY_THRESHOLD, merchant_counts=merchant_counts,
+                             resume=RESUME_FROM_CHECKPOINT)
 
     # 結果表示
     print("=" * 60)
@@ -296,8 +532,9 @@ def main():
     print("=" * 60)
     print("マスタCSV出力")
     print("=" * 60)
-    output_path, row_count = export_grouping_master(groups, merchant_counts)
-    print(f"出力ファイル: {output_path}")
+    output_paths, row_count = export_grouping_master(groups, merchant_counts)
+    for output_format, output_path in output_paths.items():
+        print(f"出力ファイル（{output_format}）: {output_path}")
     print(f"出力レコード数: {row_count} 件")
     print()
     print("【CSVカラム説明】")
@@ -5,9 +5,12 @@ import unicodedata
 import re
 import random
 from collections import defaultdict, Counter
-from difflib import SequenceMatcher
 from IPython.display import clear_output
 
+from similarity_scorer import get_scorer
+from grouping_master_io import write_master
+from japanese_normalizer import get_normalizer
+
 # =============================================================================
 # 設定値（ここを変更するとプログラム全体に反映されます）
 # =============================================================================
@@ -17,6 +20,30 @@ from IPython.display import clear_output
 # - 小さいと誤グループ化が増える、大きいと類似店名を見逃す
 PREFIX_LENGTH = 3
 
+# 店名の正規化方式
+# - 'basic': NFKC正規化・小文字化のみ（既定。既存マスタのkeywordと互換）
+# - 'japanese': さらにカタカナ→ひらがな、ハイフン・中黒・空白と末尾の長音の除去、
+#               店舗接尾辞（japanese_normalizer.STORE_SUFFIXES）の除去を行う
+#               （接尾辞は区切り・数字・文字種の変わり目の直後にあるときだけ除去し、
+#               「百貨店」など japanese_normalizer.SUFFIX_EXCEPTIONS の語は残す）
+NORMALIZATION_MODE = 'basic'
+
+# 代表名選定に使う類似度の計算方式
+# - 'sequence_matcher': SequenceMatcher.ratio() と完全に同じ値（既定）
+# - 'bitparallel_lcs': NumPyによるビット並列LCS（高速だが値はやや高めに出る近似）
+SIMILARITY_SCORER = 'sequence_matcher'
+
+# マスタの出力形式（複数指定可）
+# - 'csv': Excelでの手動修正用（既定）
+# - 'parquet': keyword / merchant_name を辞書エンコードしたParquet（要 pyarrow）
+# - 'lookup': メモリマップで開ける検索用ディレクトリ（grouping_master_io.MasterLookup で開く）
+OUTPUT_FORMATS = ['csv']
+
+# 代表名選定・キーワード抽出の並列プロセス数
+# - 0 または 1: 逐次実行（既定）
+# - 2以上: グループ単位でプロセスプールに分散（結果は逐次実行と同じ）
+PARALLEL_WORKERS = 0
+
 # =============================================================================
 
 
@@ -24,6 +51,8 @@ def normalize_text(text):
     """テキストを正規化する（表記ゆれ統一）"""
     if pd.isna(text):
         return ""
+    if NORMALIZATION_MODE == 'japanese':
+        return get_normalizer()(text)
     text = str(text).strip()
     # NFKC正規化：全角英数字→半角、半角カタカナ→全角
     text = unicodedata.normalize('NFKC', text)
@@ -32,7 +61,20 @@ def normalize_text(text):
     return text
 
 
-def select_best_representative(members, normalized_cache=None):
+def normalize_texts(texts):
+    """複数のテキストをまとめて正規化する（同じ文字列は1回だけ正規化）"""
+    if NORMALIZATION_MODE == 'japanese':
+        return get_normalizer().normalize_batch(texts)
+    cache = {}
+    result = []
+    for text in texts:
+        if text not in cache:
+            cache[text] = normalize_text(text)
+        result.append(cache[text])
+    return result
+
+
+def select_best_representative(members, normalized_cache=None, scorer=None, rng=None):
     """グループ内で最も他メンバーと類似度が高い店名を代表として選ぶ"""
     if len(members) <= 1:
         return members[0] if members else ""
@@ -40,7 +82,7 @@ def select_best_representative(members, normalized_cache=None):
     # 大きなグループはサンプリングして計算量を削減
     MAX_SAMPLE = 50
     if len(members) > MAX_SAMPLE:
-        sample_members = random.sample(members, MAX_SAMPLE)
+        sample_members = (rng or random).sample(members, MAX_SAMPLE)
     else:
         sample_members = members
 
@@ -49,17 +91,20 @@ def select_best_representative(members, normalized_cache=None):
             return normalized_cache[text]
         return normalize_text(text)
 
-    def calc_similarity(str1, str2):
-        return SequenceMatcher(None, str1, str2).ratio()
+    if scorer is None:
+        scorer = get_scorer(SIMILARITY_SCORER)
+
+    # サンプル内の全ペアの類似度を一括計算
+    sample_norms = [get_normalized(m) for m in sample_members]
+    scores = scorer.many_vs_many(sample_norms, sample_norms)
 
     best_rep = members[0]
     best_total_similarity = 0
 
-    for candidate in sample_members:
-        candidate_norm = get_normalized(candidate)
+    for i, candidate in enumerate(sample_members):
         total_similarity = sum(
-            calc_similarity(candidate_norm, get_normalized(other))
-            for other in sample_members if other != candidate
+            scores[i][j]
+            for j, other in enumerate(sample_members) if other != candidate
         )
         if total_similarity > best_total_similarity:
             best_total_similarity = total_similarity
@@ -83,19 +128,14 @@ def group_merchants_fast(merchant_names, prefix_len=PREFIX_LENGTH):
     """
     total = len(merchant_names)
 
-    # 正規化結果をキャッシュ
-    normalized_cache = {}
+    # 全店名をまとめて正規化してキャッシュ（同じ文字列を何度も正規化しない）
+    normalized_cache = dict(zip(merchant_names, normalize_texts(merchant_names)))
 
     # 前方一致でグループ化: {先頭N文字: [店名リスト]}
     prefix_groups = defaultdict(list)
 
     for idx, name in enumerate(merchant_names):
-        # キャッシュを活用した正規化
-        if name in normalized_cache:
-            normalized = normalized_cache[name]
-        else:
-            normalized = normalize_text(name)
-            normalized_cache[name] = normalized
+        normalized = normalized_cache[name]
 
         if not normalized:
             continue
@@ -118,17 +158,25 @@ def group_merchants_fast(merchant_names, prefix_len=PREFIX_LENGTH):
     groups_list = list(prefix_groups.values())
     multi_member_count = sum(1 for members in groups_list if len(members) > 1)
 
-    processed = 0
-    for members in groups_list:
-        if len(members) > 1:
-            processed += 1
-            if processed > 0 and processed % 1000 == 0:
-                clear_output(wait=True)
-                print(f"代表名再選定中: {processed:,}/{multi_member_count:,} ({processed*100//multi_member_count}%)")
-            best_rep = select_best_representative(members, normalized_cache)
-        else:
-            best_rep = members[0]
-        result.append((best_rep, members))
+    # サンプリングの乱数はグループ番号で初期化する（並列実行時も同じ代表名になる）
+    if PARALLEL_WORKERS > 1:
+        from parallel_groups import compute_representatives
+        reps = compute_representatives(groups_list, normalized_cache, PARALLEL_WORKERS,
+                                       SIMILARITY_SCORER, NORMALIZATION_MODE, module_name='group_merchants_fast')
+        result = list(zip(reps, groups_list))
+    else:
+        scorer = get_scorer(SIMILARITY_SCORER)
+        processed = 0
+        for i, members in enumerate(groups_list):
+            if len(members) > 1:
+                processed += 1
+                if processed > 0 and processed % 1000 == 0:
+                    clear_output(wait=True)
+                    print(f"代表名再選定中: {processed:,}/{multi_member_count:,} ({processed*100//multi_member_count}%)")
+                best_rep = select_best_representative(members, normalized_cache, scorer, rng=random.Random(i))
+            else:
+                best_rep = members[0]
+            result.append((best_rep, members))
 
     clear_output(wait=True)
     print(f"完了: {len(result):,} グループ（うち複数メンバー: {multi_member_count:,}）")
@@ -165,7 +213,7 @@ def extract_common_keyword_from_group(members):
     if not members or len(members) < 2:
         return ""
 
-    normalized_members = [normalize_text(m) for m in members if normalize_text(m)]
+    normalized_members = [n for n in normalize_texts(members) if n]
 
     if len(normalized_members) < 2:
         return ""
@@ -194,7 +242,8 @@ def extract_common_keyword_from_group(members):
     return keyword if len(keyword) >= 2 else shortest[:10]
 
 
-def export_grouping_master(groups, merchant_counts, output_path='output/merchant_grouping_master.csv'):
+def export_grouping_master(groups, merchant_counts, output_path='output/merchant_grouping_master.csv',
+                           output_formats=None):
     """グルーピング結果をマスタCSVとして出力する
 
     ※ 2件以上のグループのみ出力（1件のグループは出力しない）
@@ -202,15 +251,27 @@ def export_grouping_master(groups, merchant_counts, output_path='output/merchant
     Args:
         groups: グルーピング結果 [(代表名, [メンバーリスト]), ...]
         merchant_counts: 各店舗名の出現回数 Counter
-        output_path: 出力ファイルパス
+        output_path: 出力ファイルパス（CSV。他の形式は拡張子を置き換えたパスに出力）
+        output_formats: 出力形式のリスト（省略時は OUTPUT_FORMATS）
+
+    Returns:
+        ({形式: 実際に出力したパス}, 出力レコード数)
     """
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
+    # キーワード抽出（1件の場合は店名をそのままキーワードに）
+    multi_groups = [members for group_name, members in groups if len(members) >= 2]
+    if PARALLEL_WORKERS > 1:
+        from parallel_groups import compute_keywords
+        multi_keywords = iter(compute_keywords(multi_groups, PARALLEL_WORKERS, NORMALIZATION_MODE,
+                                               module_name='group_merchants_fast'))
+    else:
+        multi_keywords = (extract_common_keyword_from_group(members) for members in multi_groups)
+
     rows = []
     for group_name, members in groups:
-        # キーワード抽出（1件の場合は店名をそのままキーワードに）
         if len(members) >= 2:
-            keyword = extract_common_keyword_from_group(members)
+            keyword = next(multi_keywords)
         else:
             keyword = normalize_text(members[0])
 
@@ -225,7 +286,7 @@ def export_grouping_master(groups, merchant_counts, output_path='output/merchant
                 'group_count': group_count
             })
 
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame(rows, columns=['keyword', 'merchant_name', 'count', 'group_count'])
 
     # keywordごとのgroup_countを取得（重複排除）
     keyword_counts = df.drop_duplicates('keyword')[['keyword', 'group_count']].copy()
@@ -242,9 +303,9 @@ def export_grouping_master(groups, merchant_counts, output_path='output/merchant
     # group_countの降順でソート
     df = df.sort_values('group_count', ascending=False)
 
-    df.to_csv(output_path, index=False, encoding='utf-8-sig')
+    paths = write_master(df, output_path, output_formats or OUTPUT_FORMATS)
 
-    return output_path, len(rows)
+    return paths, len(rows)
 
 
 def main():
@@ -307,8 +368,9 @@ def main():
     print("=" * 60)
     print("マスタCSV出力")
     print("=" * 60)
-    output_path, row_count = export_grouping_master(groups, merchant_counts)
-    print(f"出力ファイル: {output_path}")
+    output_paths, row_count = export_grouping_master(groups, merchant_counts)
+    for output_format, output_path in output_paths.items():
+        print(f"出力ファイル（{output_format}）: {output_path}")
     print(f"出力レコード数: {row_count:,} 件")
     print()
     print("【CSVカラム説明】")
@@ -319,4 +381,7 @@ def main():
     print("  - cumsum_count: group_countの累積値（降順）")
     print("  - cumsum_percent: 累積割合（%）")
 
-main()
+
+# 並列実行（PARALLEL_WORKERS）時にワーカープロセスが読み込み直しても main() が再実行されないようにする
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+import os
+import json
+import importlib.util
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# グルーピングマスタの入出力
+# =============================================================================
+#
+# 出力形式:
+#   csv     : utf-8-sig のCSV（Excelでの手動修正用）
+#   parquet : keyword / merchant_name を辞書エンコードしたParquet（要 pyarrow）
+#   lookup  : メモリマップで開ける検索用ディレクトリ
+#             （店名の昇順テーブル + グループ番号配列。パース不要で開ける）
+
+# 出力形式ごとの拡張子（CSVのパスから各形式のパスを作る）
+FORMAT_SUFFIXES = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'lookup': '_lookup',
+}
+
+# 読み込み時の列の型（型推論を省略する）
+# - 手動修正で空欄になる場合があるので整数列は欠損を許す Int64 にする
+MASTER_DTYPES = {
+    'keyword': 'string',
+    'merchant_name': 'string',
+    'count': 'Int64',
+    'group_count': 'Int64',
+    'cumsum_count': 'Int64',
+    'cumsum_percent': 'float64',
+}
+
+
+def master_path_for(csv_path, output_format):
+    """CSVのパスから指定形式の出力パスを作る"""
+    base, _ = os.path.splitext(csv_path)
+    return base + FORMAT_SUFFIXES[output_format]
+
+
+def write_master_parquet(df, output_path):
+    """マスタをParquetで出力する（keyword / merchant_name は辞書エンコード）"""
+    if importlib.util.find_spec('pyarrow') is None:
+        raise ImportError("Parquet出力には pyarrow が必要です（pip install pyarrow）")
+
+    df = df.copy()
+    for col in ('keyword', 'merchant_name'):
+        df[col] = df[col].astype('category')
+    df.to_parquet(output_path, index=False, engine='pyarrow',
+                  use_dictionary=['keyword', 'merchant_name'])
+    return output_path
+
+
+def _encode_strings(strings):
+    """文字列リストを UTF-8 のバイト列とオフセット配列に変換する"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded]) if encoded else []
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def write_master_lookup(df, output_dir):
+    """マスタをメモリマップ可能な検索用ディレクトリとして出力する
+
+    出力ファイル:
+        names.npy / name_offsets.npy       : 店名（昇順）の UTF-8 バイト列とオフセット
+        group_ids.npy                      : 各店名のグループ番号（int32）
+        counts.npy                         : 各店名の出現回数（int64）
+        keywords.npy / keyword_offsets.npy : グループ番号 → keyword
+        meta.json                          : 件数などのメタ情報
+
+    ※ 同じ店名が複数行ある場合は先頭の行を採用する
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    keyword_codes, keywords = pd.factorize(df['keyword'].astype(str))
+    table = pd.DataFrame({
+        'merchant_name': df['merchant_name'].astype(str).to_numpy(),
+        'group_id': keyword_codes.astype(np.int32),
+        'count': df['count'].fillna(0).astype(np.int64).to_numpy(),
+    })
+    table = table.drop_duplicates('merchant_name')
+    # str の昇順は UTF-8 バイト列の昇順と一致するので、バイト比較で二分探索できる
+    table = table.sort_values('merchant_name', kind='stable')
+
+    name_blob, name_offsets = _encode_strings(table['merchant_name'].tolist())
+    keyword_blob, keyword_offsets = _encode_strings(list(keywords))
+
+    np.save(os.path.join(output_dir, 'names.npy'), name_blob)
+    np.save(os.path.join(output_dir, 'name_offsets.npy'), name_offsets)
+    np.save(os.path.join(output_dir, 'group_ids.npy'), table['group_id'].to_numpy(dtype=np.int32))
+    np.save(os.path.join(output_dir, 'counts.npy'), table['count'].to_numpy(dtype=np.int64))
+    np.save(os.path.join(output_dir, 'keywords.npy'), keyword_blob)
+    np.save(os.path.join(output_dir, 'keyword_offsets.npy'), keyword_offsets)
+    with open(os.path.join(output_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'name_count': len(table), 'group_count': len(keywords)}, f, ensure_ascii=False)
+
+    return output_dir
+
+
+def _load_array(path):
+    """npy をメモリマップで開く（空配列はメモリマップできないので通常読み込み）"""
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        return np.load(path)
+
+
+class MasterLookup:
+    """write_master_lookup で出力した検索用ディレクトリを開く
+
+    配列はメモリマップで開くため、起動時にファイル全体を読み込まない。
+
+    使用例:
+        lookup = MasterLookup('output/merchant_grouping_master_lookup')
+        lookup.get('セブンイレブン新宿店')  # → 'せぶんいれぶん'
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._names = _load_array(os.path.join(path, 'names.npy'))
+        self._name_offsets = _load_array(os.path.join(path, 'name_offsets.npy'))
+        self.group_ids = _load_array(os.path.join(path, 'group_ids.npy'))
+        self.counts = _load_array(os.path.join(path, 'counts.npy'))
+        self._keywords = _load_array(os.path.join(path, 'keywords.npy'))
+        self._keyword_offsets = _load_array(os.path.join(path, 'keyword_offsets.npy'))
+
+    def __len__(self):
+        return len(self._name_offsets) - 1
+
+    def _name_bytes(self, index):
+        return self._names[self._name_offsets[index]:self._name_offsets[index + 1]].tobytes()
+
+    def name(self, index):
+        """index 番目（昇順）の店名"""
+        return self._name_bytes(index).decode('utf-8')
+
+    def keyword(self, group_id):
+        """グループ番号に対応する keyword"""
+        start, end = self._keyword_offsets[group_id], self._keyword_offsets[group_id + 1]
+        return self._keywords[start:end].tobytes().decode('utf-8')
+
+    def find(self, merchant_name):
+        """店名の位置を二分探索で求める（見つからなければ -1）"""
+        target = str(merchant_name).encode('utf-8')
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name_bytes(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._name_bytes(lo) == target:
+            return lo
+        return -1
+
+    def get(self, merchant_name, default=None):
+        """店名に対応する keyword（見つからなければ default）"""
+        index = self.find(merchant_name)
+        if index < 0:
+            return default
+        return self.keyword(int(self.group_ids[index]))
+
+    def to_dataframe(self):
+        """全件を keyword / merchant_name / count の DataFrame に展開する"""
+        return pd.DataFrame({
+            'keyword': [self.keyword(int(g)) for g in self.group_ids],
+            'merchant_name': [self.name(i) for i in range(len(self))],
+            'count': np.asarray(self.counts),
+        })
+
+
+def write_master(df, csv_path, output_formats=('csv',)):
+    """マスタを指定した形式で出力する
+
+    Returns:
+        {形式: 出力パス} の辞書
+    """
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+
+    paths = {}
+    for output_format in output_formats:
+        if output_format not in FORMAT_SUFFIXES:
+            raise ValueError(f"未対応の出力形式です: {output_format}（{', '.join(FORMAT_SUFFIXES)} から選択）")
+        path = master_path_for(csv_path, output_format)
+        if output_format == 'csv':
+            df.to_csv(path, index=False, encoding='utf-8-sig')
+        elif output_format == 'parquet':
+            write_master_parquet(df, path)
+        else:
+            write_master_lookup(df, path)
+        paths[output_format] = path
+    return paths
+
+
+def read_master(path, columns=None):
+    """マスタを読み込む（拡張子から形式を判定）
+
+    Args:
+        path: .csv / .parquet ファイル、または検索用ディレクトリ
+        columns: 読み込む列（省略時は全列）
+    """
+    if os.path.isdir(path):
+        df = MasterLookup(path).to_dataframe()
+        return df[columns] if columns else df
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+
+    dtypes = {col: dtype for col, dtype in MASTER_DTYPES.items() if columns is None or col in columns}
+    return pd.read_csv(path, encoding='utf-8-sig', usecols=columns, dtype=dtypes)
@@ -0,0 +1,232 @@
+import re
+import unicodedata
+
+# =============================================================================
+# 設定値（ここを変更するとプログラム全体に反映されます）
+# =============================================================================
+
+# 末尾から取り除く店舗の接尾辞
+# - カタカナ・全角で書いてもよい（ひらがな・半角に揃えてから照合する）
+# - 直前の数字も一緒に取り除く（例: 「12号店」）
+STORE_SUFFIXES = ['店', '支店', '号店', 'fc', 'フランチャイズ', '本店', '駅前', '駅', '東口', '西口', '南口', '北口']
+
+# =============================================================================
+
+# 接尾辞で終わっていても除去しない語（接尾辞が一般名詞の一部になっているもの）
+SUFFIX_EXCEPTIONS = ['百貨店', '商店', '書店', '売店', '飯店', '酒店', '喫茶店', '専門店', '量販店']
+
+# カタカナ → ひらがな（ァ〜ヶ。ヷ〜ヺは対応するひらがながないのでそのまま）
+KANA_FOLD_TABLE = {code: code - 0x60 for code in range(ord('ァ'), ord('ヶ') + 1)}
+
+# 区切りとして取り除く記号（ハイフン類・中黒・空白）
+# ※ NFKC 後に適用するので半角の ･ や全角スペースは既に全角の ・ や半角スペースになっている
+SEPARATOR_CHARACTERS = (
+    '-‐‑‒–—―−'
+    '・·'
+    ' \t　'
+)
+# 区切り記号はいったん半角スペースに揃え（接尾辞の境目の判定に使う）、最後にまとめて取り除く
+SEPARATOR = ' '
+SEPARATOR_TABLE = {ord(ch): SEPARATOR for ch in SEPARATOR_CHARACTERS}
+
+# 末尾だけ取り除く長音（「コンピューター」「コンピュータ」を揃える。語中の長音は残す）
+LONG_VOWEL = 'ー'
+
+DIGITS = '0123456789'
+
+# 文字種（接尾辞を含む語の中で文字種が変わるかの判定に使う）
+SCRIPT_CLASSES = {
+    'latin': 'a-z',
+    'kana': '\u3041-\u30ff',
+    'kanji': '\u4e00-\u9fff々',
+}
+
+
+def _build_table(mapping):
+    """str.translate 用の変換表を基本多言語面（U+0000〜U+FFFF）全体の tuple にする
+
+    dict の表より速く引ける（面外の文字は LookupError となり、そのまま残る）。
+    """
+    table = list(range(0x10000))
+    for code, value in mapping.items():
+        table[code] = value
+    return tuple(table)
+
+
+def _other_script_pattern(ch):
+    """ch と異なる文字種の文字に一致する正規表現"""
+    for chars in SCRIPT_CLASSES.values():
+        if re.fullmatch(f'[{chars}]', ch):
+            return re.compile(f'[^{chars}]')
+    return re.compile('[{}]'.format(''.join(SCRIPT_CLASSES.values())))
+
+
+class JapaneseNormalizer:
+    """店名の表記ゆれを吸収する正規化
+
+    1文字列あたり以下を1回ずつ適用する:
+        1. NFKC 正規化（全角英数字→半角、半角カタカナ→全角）と小文字化
+        2. 事前に作成した変換表による str.translate
+           （カタカナ→ひらがな、ハイフン・中黒・空白を区切りの半角スペースに統一）
+        3. 末尾の店舗接尾辞の除去（支店名との境目がある場合のみ。下記）
+        4. 区切りと末尾の長音の除去
+
+    接尾辞は、直前が区切り記号・数字の場合か、接尾辞を含む語（最後の区切り以降）の中で
+    文字種が変わる場合（「セブンイレブン渋谷店」の「ン」→「渋」など）にだけ除去する。
+    「百貨店」「東京駅」のように語全体が同じ文字種のものや、英字の直後の英字の接尾辞
+    （「KFC」の「fc」）、SUFFIX_EXCEPTIONS の語は除去しない。除去すると空になる場合も除去しない。
+    末尾が接尾辞でない店名（大半）は str.endswith 1回で判定を終える。
+
+    例: 「セブン-イレブン 渋谷店」→「せぶんいれぶん渋谷」
+    """
+
+    def __init__(self, store_suffixes=None, fold_kana=True, strip_marks=True, suffix_exceptions=None):
+        table = {}
+        if fold_kana:
+            table.update(KANA_FOLD_TABLE)
+        table.update(SEPARATOR_TABLE)
+        self.table = _build_table(table)
+        self.strip_marks = strip_marks
+
+        suffixes = STORE_SUFFIXES if store_suffixes is None else store_suffixes
+        exceptions = SUFFIX_EXCEPTIONS if suffix_exceptions is None else suffix_exceptions
+        self.store_suffixes = tuple(suffixes)
+        self.suffix_exceptions = tuple(exceptions)
+
+        # 接尾辞・例外語も同じ正規化をかけてから照合する（長い接尾辞を優先）
+        folded_suffixes = sorted({self._fold(s) for s in suffixes if self._fold(s)}, key=len, reverse=True)
+        folded_exceptions = [self._fold(w) for w in exceptions if self._fold(w)]
+        self.folded_suffixes = tuple(folded_suffixes)
+        # 接尾辞ごとの (接尾辞, その接尾辞で終わる例外語, 異なる文字種の正規表現)（末尾の文字で引く）
+        self._suffix_rules = {}
+        for suffix in folded_suffixes:
+            rule = (
+                suffix,
+                tuple(w for w in folded_exceptions if len(w) > len(suffix) and w.endswith(suffix)),
+                _other_script_pattern(suffix[0]),
+            )
+            self._suffix_rules.setdefault(suffix[-1], []).append(rule)
+
+    def _fold(self, text):
+        return unicodedata.normalize('NFKC', text).lower().strip().translate(self.table)
+
+    def _strip_suffixes(self, text):
+        """末尾の接尾辞を、支店名との境目がある場合にだけ繰り返し除去する"""
+        while text:
+            for suffix, exceptions, other_script in self._suffix_rules.get(text[-1], ()):
+                if not text.endswith(suffix) or (exceptions and text.endswith(exceptions)):
+                    continue
+                stem = text[:-len(suffix)]
+                core = stem.rstrip(DIGITS)
+                head = core.rstrip(SEPARATOR)
+                if not head:
+                    continue
+                # 直前が数字・区切り記号でなければ、語の中に区切りか文字種の変化が必要
+                # （英字の直後の英字の接尾辞は店名の一部とみなす: 「kfc」の「fc」）
+                if core == stem and head == core and (
+                        ('a' <= head[-1] <= 'z' and 'a' <= suffix[0] <= 'z')
+                        or (SEPARATOR not in head and not other_script.search(head))):
+                    continue
+                text = head
+                break
+            else:
+                break
+        return text
+
+    def _finish(self, text):
+        """変換表を適用済みの文字列に、接尾辞と区切り・末尾の長音の除去を行う"""
+        if self.folded_suffixes and text.endswith(self.folded_suffixes):
+            text = self._strip_suffixes(text)
+        if self.strip_marks:
+            text = text.replace(SEPARATOR, '')
+            if text.endswith(LONG_VOWEL):
+                text = text.rstrip(LONG_VOWEL) or text
+        return text
+
+    def __call__(self, text):
+        """1件の文字列を正規化する（前後の空白も除去される）"""
+        return self._finish(self._fold(str(text)))
+
+    def normalize_batch(self, texts):
+        """複数の文字列をまとめて正規化する
+
+        同じ文字列は1回だけ正規化する。欠損（None / NaN）は空文字になる。
+
+        Returns:
+            texts と同じ順の正規化済み文字列リスト
+        """
+        nfkc = unicodedata.normalize
+        table = self.table
+        finish = self._finish
+        cache = {}
+        result = []
+        for text in texts:
+            normalized = cache.get(text)
+            if normalized is None:
+                if text is None or (isinstance(text, float) and text != text):
+                    normalized = ""
+                else:
+                    normalized = finish(nfkc('NFKC', str(text)).lower().strip().translate(table))
+                cache[text] = normalized
+            result.append(normalized)
+        return result
+
+
+_default_normalizer = None
+
+
+def normalize(text):
+    """既定の設定（STORE_SUFFIXES）で1件の文字列を正規化する"""
+    return get_normalizer()(text)
+
+
+def get_normalizer():
+    """既定の設定の JapaneseNormalizer を返す（STORE_SUFFIXES・SUFFIX_EXCEPTIONS が変わった時だけ作り直す）"""
+    global _default_normalizer
+    if (_default_normalizer is None or _default_normalizer.store_suffixes != tuple(STORE_SUFFIXES)
+            or _default_normalizer.suffix_exceptions != tuple(SUFFIX_EXCEPTIONS)):
+        _default_normalizer = JapaneseNormalizer()
+    return _default_normalizer
+
+
+# 正規化の確認用の例（入力, 期待する出力）
+NORMALIZATION_EXAMPLES = [
+    ('セブン-イレブン 渋谷店', 'せぶんいれぶん渋谷'),
+    ('セブンイレブン渋谷店', 'せぶんいれぶん渋谷'),
+    ('ｾﾌﾞﾝｲﾚﾌﾞﾝ 品川駅前店', 'せぶんいれぶん品川'),
+    ('ローソン12号店', 'ろーそん'),
+    ('ドトール FC', 'どとーる'),
+    ('KFC', 'kfc'),
+    ('百貨店', '百貨店'),
+    ('大丸 百貨店', '大丸百貨店'),
+    ('東京駅', '東京駅'),
+    ('スーパー', 'すーぱ'),
+    ('スパ', 'すぱ'),
+    ('コンピューター', 'こんぴゅーた'),
+    ('店', '店'),
+]
+
+
+def check_examples(normalizer=None):
+    """NORMALIZATION_EXAMPLES を正規化し、期待と異なるものを返す
+
+    Returns:
+        [(入力, 期待する出力, 実際の出力), ...]
+    """
+    normalizer = normalizer or get_normalizer()
+    return [(text, expected, normalizer(text)) for text, expected in NORMALIZATION_EXAMPLES
+            if normalizer(text) != expected]
+
+
+def main():
+    mismatches = check_examples()
+    if mismatches:
+        print(f"期待と異なる正規化結果が {len(mismatches)} 件あります")
+        for text, expected, actual in mismatches:
+            print(f"  {text!r}: 期待 {expected!r} / 実際 {actual!r}")
+    else:
+        print(f"正規化の例 {len(NORMALIZATION_EXAMPLES)} 件はすべて期待どおりです")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+import os
+import glob
+import heapq
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from IPython.display import clear_output
+
+from grouping_master_io import MASTER_DTYPES, MasterLookup
+
+# =============================================================================
+# 設定値（ここを変更するとプログラム全体に反映されます）
+# =============================================================================
+
+# 集計対象
+# - 'master': グルーピングマスタの keyword ごとの count 合計
+# - 'transactions': 取引データ（tran*.csv）の店名ごとの取引件数
+COVERAGE_SOURCE = 'master'
+
+# 集計方式
+# - 'exact': 全キーの件数を数えて累積和から求める（キー数に比例したメモリが必要）
+# - 'sketch': Space-Saving で上位キーだけを保持する（メモリは SKETCH_CAPACITY 件分で一定、結果は上下限つき）
+COVERAGE_MODE = 'exact'
+
+# Space-Saving で保持するキーの数（多いほど上下限の幅が狭くなる）
+SKETCH_CAPACITY = 10000
+
+# 求める累積カバー率（%）
+COVERAGE_PERCENTS = [50, 80, 90, 95, 99]
+
+# 1回に読み込む行数
+CHUNK_SIZE = 200000
+
+# 入力（.csv / .parquet / 検索用ディレクトリ（*_lookup）のいずれも指定可）
+MASTER_PATH = 'output/merchant_grouping_master.csv'
+TRANSACTION_GLOB = 'data/tran*.csv'
+
+# 表示する上位キーの数
+TOP_N = 10
+
+# =============================================================================
+
+
+class SpaceSaving:
+    """重み付き Space-Saving による上位キー（heavy hitter）の推定
+
+    最大 capacity 件のキーについて (推定件数, 誤差) を保持する。満杯の状態で新しいキーが来たら
+    推定件数が最小のキーを追い出し、その件数を誤差として引き継ぐ。
+    保持しているキーの真の件数は [推定件数 - 誤差, 推定件数] に入り、
+    保持していないキーの真の件数は min_count() 以下になる。
+    """
+
+    def __init__(self, capacity=SKETCH_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}   # キー → 推定件数
+        self.errors = {}   # キー → 誤差（過大評価の上限）
+        self.heap = []     # (推定件数, キー) の最小ヒープ（古い件数のエントリを含む）
+        self.total = 0     # 全キーの件数の合計（正確）
+
+    def _drop_stale(self):
+        while self.heap and self.counts.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    def _compact(self):
+        """古いエントリが溜まったらヒープを作り直す"""
+        if len(self.heap) > 4 * max(self.capacity, 1):
+            self.heap = [(count, key) for key, count in self.counts.items()]
+            heapq.heapify(self.heap)
+
+    def add(self, key, weight=1):
+        if weight <= 0:
+            return
+        self.total += weight
+
+        count = self.counts.get(key)
+        if count is None:
+            if len(self.counts) < self.capacity:
+                count, error = weight, 0
+            else:
+                self._drop_stale()
+                min_count, evicted = heapq.heappop(self.heap)
+                del self.counts[evicted]
+                del self.errors[evicted]
+                count, error = min_count + weight, min_count
+            self.errors[key] = error
+        else:
+            count += weight
+        self.counts[key] = count
+        heapq.heappush(self.heap, (count, key))
+        self._compact()
+
+    def update(self, counts):
+        """{キー: 件数} をまとめて加える（チャンク内で集計済みの件数を渡すと速い）"""
+        for key, weight in counts.items():
+            self.add(key, int(weight))
+
+    def min_count(self):
+        """保持していないキーの件数の上限"""
+        if len(self.counts) < self.capacity:
+            return 0
+        self._drop_stale()
+        return self.heap[0][0] if self.heap else 0
+
+    def top(self, n=None):
+        """推定件数の降順に [(キー, 推定件数, 誤差), ...] を返す"""
+        items = sorted(self.counts.items(), key=lambda item: -item[1])
+        if n is not None:
+            items = items[:n]
+        return [(key, count, self.errors[key]) for key, count in items]
+
+
+def iter_master_counts(path=MASTER_PATH, chunk_size=CHUNK_SIZE):
+    """マスタを少しずつ読み、チャンクごとの {keyword: count合計} を返す"""
+    if os.path.isdir(path):
+        # 検索用ディレクトリはメモリマップした配列をグループ番号で集計する
+        lookup = MasterLookup(path)
+        for start in range(0, len(lookup), chunk_size):
+            group_ids = np.asarray(lookup.group_ids[start:start + chunk_size])
+            counts = np.asarray(lookup.counts[start:start + chunk_size])
+            ids, inverse = np.unique(group_ids, return_inverse=True)
+            sums = np.bincount(inverse, weights=counts, minlength=len(ids))
+            yield pd.Series(sums.astype(np.int64), index=[lookup.keyword(int(g)) for g in ids])
+        return
+
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquetの読み込みには pyarrow が必要です（pip install pyarrow）")
+        batches = (batch.to_pandas() for batch in
+                   pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=['keyword', 'count']))
+    else:
+        dtypes = {col: MASTER_DTYPES[col] for col in ('keyword', 'count')}
+        batches = pd.read_csv(path, encoding='utf-8-sig', usecols=['keyword', 'count'], dtype=dtypes,
+                              chunksize=chunk_size)
+
+    for chunk in batches:
+        chunk = chunk.dropna(subset=['keyword'])
+        yield chunk.groupby('keyword', observed=True)['count'].sum()
+
+
+def iter_transaction_counts(pattern=TRANSACTION_GLOB, chunk_size=CHUNK_SIZE):
+    """取引データを少しずつ読み、チャンクごとの {店名: 取引件数} を返す"""
+    csv_files = sorted(glob.glob(pattern))
+    for i, csv_file in enumerate(csv_files):
+        clear_output(wait=True)
+        print(f"ファイル読み込み中: {i + 1}/{len(csv_files)}")
+        # Merchant Name列（6列目）だけを読む
+        for chunk in pd.read_csv(csv_file, encoding='utf-8-sig', usecols=[5], dtype='string',
+                                 chunksize=chunk_size):
+            yield chunk.iloc[:, 0].dropna().value_counts()
+
+
+def iter_source_counts(source=COVERAGE_SOURCE, master_path=MASTER_PATH, transaction_glob=TRANSACTION_GLOB,
+                       chunk_size=CHUNK_SIZE):
+    """集計対象に応じてチャンクごとの {キー: 件数} を返す"""
+    if source == 'master':
+        return iter_master_counts(master_path, chunk_size)
+    if source == 'transactions':
+        return iter_transaction_counts(transaction_glob, chunk_size)
+    raise ValueError(f"未対応の集計対象です: {source}（'master' / 'transactions' から選択）")
+
+
+def exact_coverage(counts, percents=COVERAGE_PERCENTS):
+    """全キーの件数から、各カバー率に必要な上位キー数を求める
+
+    降順の累積和を1回だけ作り、全てのカバー率を searchsorted でまとめて引く。
+
+    Args:
+        counts: キーごとの件数（順不同）
+
+    Returns:
+        [{'percent', 'keys', 'key_percent', 'threshold'}, ...]
+        keys は上位何件でカバー率に達するか、threshold はその最後のキーの件数
+    """
+    values = np.sort(np.asarray(counts, dtype=np.int64))[::-1]
+    cumsum = np.cumsum(values)
+    total = cumsum[-1] if len(cumsum) else 0
+
+    targets = np.asarray(percents, dtype=np.float64) / 100 * total
+    positions = np.searchsorted(cumsum, targets, side='left')
+
+    results = []
+    for percent, position in zip(percents, positions):
+        if position >= len(values):
+            position = len(values) - 1
+        results.append({
+            'percent': percent,
+            'keys': int(position) + 1 if len(values) else 0,
+            'key_percent': (int(position) + 1) / len(values) * 100 if len(values) else 0.0,
+            'threshold': int(values[position]) if len(values) else 0,
+        })
+    return results
+
+
+def sketch_coverage(sketch, percents=COVERAGE_PERCENTS):
+    """Space-Saving の結果から、各カバー率に必要な上位キー数の上下限を求める
+
+    上位 k 件の真の合計は
+        下限: 保証件数（推定件数 - 誤差）の大きい順に k 件の合計
+        上限: 推定件数の大きい順に k 件の合計（保持していないキーは min_count() 以下なので超えない）
+    の間に入るため、必要なキー数は
+        keys_min: 上限の累積和がカバー率に達する件数
+        keys_max: 下限の累積和がカバー率に達する件数（保持件数内で達しない場合は None）
+    になる。
+
+    Returns:
+        [{'percent', 'keys_min', 'keys_max', 'threshold'}, ...]
+        threshold は keys_min 件目のキーの推定件数
+    """
+    counts = np.sort(np.fromiter(sketch.counts.values(), dtype=np.int64))[::-1]
+    guaranteed = np.sort(np.fromiter((sketch.counts[k] - sketch.errors[k] for k in sketch.counts),
+                                     dtype=np.int64))[::-1]
+    upper_cumsum = np.cumsum(counts)
+    lower_cumsum = np.cumsum(guaranteed)
+
+    targets = np.asarray(percents, dtype=np.float64) / 100 * sketch.total
+    upper_positions = np.searchsorted(upper_cumsum, targets, side='left')
+    lower_positions = np.searchsorted(lower_cumsum, targets, side='left')
+
+    results = []
+    for percent, upper, lower in zip(percents, upper_positions, lower_positions):
+        reached = upper < len(counts)
+        results.append({
+            'percent': percent,
+            'keys_min': int(upper) + 1 if reached else None,
+            'keys_max': int(lower) + 1 if lower < len(guaranteed) else None,
+            'threshold': int(counts[upper]) if reached else None,
+        })
+    return results
+
+
+def main():
+    print("=" * 60)
+    print(f"累積カバー率の分析（{COVERAGE_SOURCE} / {COVERAGE_MODE}）")
+    print("=" * 60)
+
+    if COVERAGE_MODE == 'exact':
+        totals = Counter()
+        for chunk_counts in iter_source_counts(COVERAGE_SOURCE, MASTER_PATH, TRANSACTION_GLOB, CHUNK_SIZE):
+            totals.update({key: int(count) for key, count in chunk_counts.items()})
+        clear_output(wait=True)
+
+        total = sum(totals.values())
+        print(f"ユニークキー数: {len(totals):,}")
+        print(f"件数合計: {total:,}")
+        print()
+        print("累積カバー率:")
+        for row in exact_coverage(list(totals.values()), COVERAGE_PERCENTS):
+            print(f"  上位 {row['keys']:,} キー ({row['key_percent']:.1f}%) で {row['percent']}%カバー "
+                  f"(閾値: {row['threshold']:,})")
+        print()
+        print("上位キーの詳細:")
+        for i, (key, count) in enumerate(totals.most_common(TOP_N), 1):
+            print(f"  {i}. {key}: {count:,}")
+
+    elif COVERAGE_MODE == 'sketch':
+        sketch = SpaceSaving(SKETCH_CAPACITY)
+        for chunk_counts in iter_source_counts(COVERAGE_SOURCE, MASTER_PATH, TRANSACTION_GLOB, CHUNK_SIZE):
+            sketch.update(chunk_counts)
+        clear_output(wait=True)
+
+        print(f"保持キー数: {len(sketch.counts):,} / {SKETCH_CAPACITY:,}")
+        print(f"件数合計: {sketch.total:,}")
+        print(f"保持していないキーの件数上限: {sketch.min_count():,}")
+        print()
+        print("累積カバー率（上位キー数の下限〜上限）:")
+        for row in sketch_coverage(sketch, COVERAGE_PERCENTS):
+            if row['keys_min'] is None:
+                print(f"  {row['percent']}%カバー: 保持キー数を超えるため推定不可（SKETCH_CAPACITY を増やしてください）")
+                continue
+            keys_max = f"{row['keys_max']:,}" if row['keys_max'] is not None else f"{SKETCH_CAPACITY:,}超"
+            print(f"  上位 {row['keys_min']:,}〜{keys_max} キーで {row['percent']}%カバー "
+                  f"(閾値: {row['threshold']:,})")
+        print()
+        print("上位キーの詳細（件数は 推定件数 - 誤差 〜 推定件数）:")
+        for i, (key, count, error) in enumerate(sketch.top(TOP_N), 1):
+            print(f"  {i}. {key}: {count - error:,} 〜 {count:,}")
+
+    else:
+        raise ValueError(f"未対応の集計方式です: {COVERAGE_MODE}（'exact' / 'sketch' から選択）")
+
+
+# Jupyter Notebookで実行する場合は main() を呼び出してください
+# main()
@@ -0,0 +1,338 @@
+import os
+import json
+import time
+import threading
+import unicodedata
+import urllib.request
+from collections import Counter, deque
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from group_merchants import SIMILARITY_THRESHOLD, SIMILARITY_SCORER
+from japanese_normalizer import get_normalizer
+from grouping_master_io import read_master
+from similarity_scorer import get_scorer
+
+# =============================================================================
+# 設定値（ここを変更するとプログラム全体に反映されます）
+# =============================================================================
+
+# 読み込むマスタ（.csv / .parquet / 検索用ディレクトリ（*_lookup）のいずれも指定可）
+MASTER_PATH = 'output/merchant_grouping_master.csv'
+
+# 店名の正規化方式（マスタを作成したときの NORMALIZATION_MODE に合わせる）
+# - 'basic': NFKC正規化・小文字化のみ
+# - 'japanese': japanese_normalizer による正規化（keyword がひらがな・接尾辞除去済みのマスタ用）
+NORMALIZATION_MODE = 'basic'
+
+# 待ち受けアドレス（ローカルからのみ接続できるよう 127.0.0.1 を既定にする）
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8765
+
+# あいまい検索結果のキャッシュ件数（LRU）
+FUZZY_CACHE_SIZE = 100000
+
+# マスタの更新を確認する間隔（秒）
+RELOAD_CHECK_INTERVAL = 5.0
+
+# 直近何件のリクエストからレイテンシの分位点を求めるか
+LATENCY_WINDOW = 1000
+
+# =============================================================================
+
+NORMALIZATION_MODES = ('basic', 'japanese')
+
+
+def normalize_name(text, mode=NORMALIZATION_MODE):
+    """指定した方式で店名を正規化する"""
+    if mode == 'japanese':
+        return get_normalizer()(text)
+    # group_merchants.normalize_text は group_merchants 側の設定に従うので、basic はここで揃える
+    if mode == 'basic':
+        return unicodedata.normalize('NFKC', str(text).strip()).lower()
+    raise ValueError(f"未対応の正規化方式です: {mode}（{', '.join(NORMALIZATION_MODES)} から選択）")
+
+
+class MerchantIndex:
+    """マスタをメモリ上に保持し、店名から keyword を引く
+
+    検索順:
+        1. exact   : 元の店名の完全一致
+        2. normalized : 正規化後の店名の完全一致
+        3. keyword : 正規化後の店名に keyword を含む（最長の keyword を採用）
+        4. fuzzy   : マスタの正規化店名との類似度が閾値以上（最も高いものを採用）
+    3・4 の結果は LRU キャッシュに保持する。
+    正規化は normalization_mode（マスタ作成時と同じ方式）で行う。
+    """
+
+    def __init__(self, df, threshold=SIMILARITY_THRESHOLD, cache_size=FUZZY_CACHE_SIZE, scorer=None,
+                 normalization_mode=NORMALIZATION_MODE):
+        if normalization_mode not in NORMALIZATION_MODES:
+            raise ValueError(f"未対応の正規化方式です: {normalization_mode}（{', '.join(NORMALIZATION_MODES)} から選択）")
+        self.normalization_mode = normalization_mode
+        self.threshold = threshold
+        self.scorer = scorer or get_scorer(SIMILARITY_SCORER)
+
+        df = df.dropna(subset=['keyword', 'merchant_name'])
+        names = df['merchant_name'].astype(str).tolist()
+        keywords = df['keyword'].astype(str).tolist()
+        self.exact = dict(zip(names, keywords))
+
+        self.normalized = {}
+        for name, keyword in zip(names, keywords):
+            self.normalized.setdefault(self.normalize(name), keyword)
+        self.normalized.pop('', None)
+        self._normalized_names = list(self.normalized)
+
+        # 長い keyword ほど具体的なので先に照合する
+        self._keywords = sorted({k for k in keywords if k}, key=len, reverse=True)
+
+        self._fallback = lru_cache(maxsize=cache_size)(self._fallback_uncached)
+
+    def __len__(self):
+        return len(self.exact)
+
+    def normalize(self, name):
+        return normalize_name(name, self.normalization_mode)
+
+    def _fallback_uncached(self, normalized):
+        for keyword in self._keywords:
+            if keyword in normalized:
+                return keyword, 'keyword', 1.0
+
+        scores = self.scorer.one_vs_many(normalized, self._normalized_names, self.threshold)
+        best_index, best_score = -1, 0.0
+        for i, score in enumerate(scores):
+            if score >= self.threshold and score > best_score:
+                best_index, best_score = i, score
+        if best_index >= 0:
+            return self.normalized[self._normalized_names[best_index]], 'fuzzy', best_score
+        return None, 'none', 0.0
+
+    def lookup(self, name):
+        """1件の店名を検索する
+
+        Returns:
+            {'name', 'keyword', 'match', 'score'} の辞書（見つからない場合 keyword は None）
+        """
+        if name in self.exact:
+            return {'name': name, 'keyword': self.exact[name], 'match': 'exact', 'score': 1.0}
+
+        normalized = self.normalize(name)
+        if not normalized:
+            return {'name': name, 'keyword': None, 'match': 'none', 'score': 0.0}
+        if normalized in self.normalized:
+            return {'name': name, 'keyword': self.normalized[normalized], 'match': 'normalized', 'score': 1.0}
+
+        keyword, match, score = self._fallback(normalized)
+        return {'name': name, 'keyword': keyword, 'match': match, 'score': score}
+
+    def lookup_batch(self, names):
+        """複数の店名をまとめて検索する（同じ店名は1回だけ検索）"""
+        cache = {}
+        results = []
+        for name in names:
+            if name not in cache:
+                cache[name] = self.lookup(name)
+            results.append(cache[name])
+        return results
+
+    def cache_info(self):
+        return self._fallback.cache_info()
+
+
+class MerchantLookupService:
+    """マスタの読み込み・ホットリロード・統計を管理する
+
+    マスタのファイル（検索用ディレクトリの場合はその中の最新ファイル）の
+    更新時刻を RELOAD_CHECK_INTERVAL ごとに確認し、変わっていれば読み直す。
+    """
+
+    def __init__(self, master_path=MASTER_PATH, normalization_mode=NORMALIZATION_MODE):
+        self.master_path = master_path
+        self.normalization_mode = normalization_mode
+        self._lock = threading.Lock()
+        # スコアラーは内部状態を持つため、検索はスレッド間で1件ずつ行う
+        self._lookup_lock = threading.Lock()
+        self._last_check = 0.0
+        self._mtime = None
+        self.index = None
+        self.reload_count = 0
+
+        self.started_at = time.time()
+        self.request_count = 0
+        self.name_count = 0
+        self.match_counts = Counter()
+        self.latency_total = 0.0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+        self.reload()
+
+    def _master_mtime(self):
+        if os.path.isdir(self.master_path):
+            return max(os.path.getmtime(os.path.join(self.master_path, f)) for f in os.listdir(self.master_path))
+        return os.path.getmtime(self.master_path)
+
+    def reload(self):
+        """マスタを読み込み直す（読み込み中も古いインデックスで応答を続ける）"""
+        mtime = self._master_mtime()
+        df = read_master(self.master_path, columns=['keyword', 'merchant_name'])
+        index = MerchantIndex(df, normalization_mode=self.normalization_mode)
+        with self._lock:
+            self.index = index
+            self._mtime = mtime
+            self.reload_count += 1
+
+    def maybe_reload(self):
+        now = time.time()
+        if now - self._last_check < RELOAD_CHECK_INTERVAL:
+            return
+        self._last_check = now
+        try:
+            if self._master_mtime() != self._mtime:
+                self.reload()
+        except (OSError, ValueError) as e:
+            # 書き込み途中などで読めない場合は古いマスタのまま次回に再試行する
+            print(f"マスタの再読み込みに失敗しました: {e}")
+
+    def lookup(self, names):
+        self.maybe_reload()
+        start = time.perf_counter()
+        with self._lookup_lock:
+            results = self.index.lookup_batch(names)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.request_count += 1
+            self.name_count += len(names)
+            self.match_counts.update(r['match'] for r in results)
+            self.latency_total += elapsed
+            self._latencies.append(elapsed)
+        return results
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            uptime = time.time() - self.started_at
+            cache = self.index.cache_info()
+
+            def percentile(p):
+                return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+            return {
+                'master_path': self.master_path,
+                'normalization_mode': self.normalization_mode,
+                'master_names': len(self.index),
+                'reload_count': self.reload_count,
+                'uptime_seconds': round(uptime, 1),
+                'requests': self.request_count,
+                'names': self.name_count,
+                'names_per_second': round(self.name_count / uptime, 1) if uptime else 0.0,
+                'latency_ms_mean': round(self.latency_total / self.request_count * 1000, 3) if self.request_count else 0.0,
+                'latency_ms_p50': round(percentile(0.50), 3),
+                'latency_ms_p95': round(percentile(0.95), 3),
+                'matches': dict(self.match_counts),
+                'fuzzy_cache': {'hits': cache.hits, 'misses': cache.misses, 'size': cache.currsize},
+            }
+
+
+def make_handler(service):
+    """サービスを参照するリクエストハンドラを作成する
+
+    POST /lookup  {"names": [...]}  → {"results": [...]}
+    GET  /stats                     → 統計情報
+    GET  /health                    → {"status": "ok"}
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._send_json(200, service.stats())
+            elif self.path == '/health':
+                self._send_json(200, {'status': 'ok'})
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/lookup':
+                self._send_json(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(payload, dict):
+                    raise ValueError('リクエストは {"names": [...]} の形式で指定してください')
+                names = payload['names']
+                if not isinstance(names, list):
+                    raise ValueError('names はリストで指定してください')
+            except (KeyError, TypeError, ValueError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            self._send_json(200, {'results': service.lookup([str(n) for n in names])})
+
+        def log_message(self, format, *args):
+            # リクエストごとのログは出さない（統計は /stats で確認）
+            pass
+
+    return Handler
+
+
+def start_service(master_path=MASTER_PATH, host=SERVICE_HOST, port=SERVICE_PORT, background=False,
+                  normalization_mode=NORMALIZATION_MODE):
+    """検索サービスを起動する
+
+    Args:
+        background: True ならスレッドで起動してすぐ戻る（Jupyterでの利用・動作確認用）。
+                    port=0 を指定すると空いているポートを使う。
+        normalization_mode: マスタを作成したときの正規化方式（'basic' / 'japanese'）
+
+    Returns:
+        (server, service)。停止は server.shutdown()
+    """
+    service = MerchantLookupService(master_path, normalization_mode)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"店名検索サービス起動: http://{host}:{server.server_port}（マスタ {len(service.index):,} 件）")
+
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+    return server, service
+
+
+def lookup(names, url=f'http://{SERVICE_HOST}:{SERVICE_PORT}', timeout=30):
+    """起動中のサービスに店名をまとめて問い合わせる
+
+    Returns:
+        [{'name', 'keyword', 'match', 'score'}, ...]（names と同じ順）
+    """
+    body = json.dumps({'names': list(names)}, ensure_ascii=False).encode('utf-8')
+    request = urllib.request.Request(f'{url}/lookup', data=body,
+                                     headers={'Content-Type': 'application/json; charset=utf-8'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())['results']
+
+
+def fetch_stats(url=f'http://{SERVICE_HOST}:{SERVICE_PORT}', timeout=30):
+    """起動中のサービスの統計情報を取得する"""
+    with urllib.request.urlopen(f'{url}/stats', timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def main():
+    start_service(MASTER_PATH, SERVICE_HOST, SERVICE_PORT, normalization_mode=NORMALIZATION_MODE)
+
+
+if __name__ == '__main__':
+    main()
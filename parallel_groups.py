@@ -0,0 +1,229 @@
+import random
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from IPython.display import clear_output
+
+import japanese_normalizer
+from similarity_scorer import get_scorer
+
+# =============================================================================
+# グルーピング後処理（代表名選定・キーワード抽出）の並列実行
+# =============================================================================
+#
+# グループごとの処理は互いに独立なので、プロセスプールで並列に実行する。
+# - グループのメンバーと正規化キャッシュはワーカー起動時に1回だけ渡す
+#   （タスクごとにはグループ番号のリストだけを送る）
+# - 大きいグループは単独のタスクにして先に投入し、小さいグループはまとめて1タスクにする
+# - 代表名選定のサンプリングはグループ番号で乱数を初期化するので、
+#   逐次実行と同じ結果が同じ順序で得られる
+# - 代表名選定・キーワード抽出は呼び出し元のモジュール（group_merchants /
+#   group_merchants_fast）の関数を使う（両者は実装が異なるため）
+
+# 1ワーカーあたりのタスク数の目安（多いほど負荷が均等になるが、タスク送受信が増える）
+CHUNKS_PER_WORKER = 8
+
+_worker_member_lists = None
+_worker_group_indices = None
+_worker_normalized_cache = None
+_worker_weights = None
+_worker_scorer = None
+_worker_module = None
+
+
+def representative_rng(group_index):
+    """代表名選定のサンプリングに使う乱数（グループ番号で初期化）"""
+    return random.Random(group_index)
+
+
+def _init_worker(member_lists, group_indices, normalized_cache, weights, scorer_name, normalization_mode,
+                 store_suffixes, module_name):
+    """ワーカー起動時に1回だけ呼ばれ、共有データと設定を受け取る"""
+    global _worker_member_lists, _worker_group_indices, _worker_normalized_cache, _worker_weights, _worker_scorer
+    global _worker_module
+    _worker_module = importlib.import_module(module_name)
+    _worker_member_lists = member_lists
+    _worker_group_indices = group_indices
+    _worker_normalized_cache = normalized_cache
+    _worker_weights = weights
+    _worker_scorer = get_scorer(scorer_name) if scorer_name else None
+
+    # spawn 方式ではモジュールが既定値で読み込み直されるので、呼び出し元の設定に揃える
+    _worker_module.NORMALIZATION_MODE = normalization_mode
+    japanese_normalizer.STORE_SUFFIXES = list(store_suffixes)
+
+
+def _run_representatives(chunk):
+    # 重みは group_merchants の正規化キー単位のグルーピングでのみ使う
+    options = {'weights': _worker_weights} if _worker_weights is not None else {}
+    return [
+        (index, _worker_module.select_best_representative(
+            _worker_member_lists[index], _worker_normalized_cache, _worker_scorer,
+            rng=representative_rng(_worker_group_indices[index]), **options))
+        for index in chunk
+    ]
+
+
+def _run_keywords(chunk):
+    return [
+        (index, _worker_module.extract_common_keyword_from_group(_worker_member_lists[index]))
+        for index in chunk
+    ]
+
+
+def make_chunks(costs, workers):
+    """グループの推定コストからタスクを作る
+
+    コストが目安以上のグループは単独タスク（コストの降順）、
+    それ未満のグループは元の順に目安に達するまでまとめる。
+
+    Returns:
+        [[グループ番号, ...], ...]（投入順）
+    """
+    total = sum(costs)
+    target = max(total / (workers * CHUNKS_PER_WORKER), 1)
+
+    big = sorted((i for i, cost in enumerate(costs) if cost >= target), key=lambda i: -costs[i])
+    chunks = [[i] for i in big]
+
+    current, current_cost = [], 0
+    for i, cost in enumerate(costs):
+        if cost >= target:
+            continue
+        current.append(i)
+        current_cost += cost
+        if current_cost >= target:
+            chunks.append(current)
+            current, current_cost = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _run_parallel(task, member_lists, costs, workers, label, group_indices=None, normalized_cache=None,
+                  weights=None, scorer_name=None, normalization_mode='basic', module_name='group_merchants'):
+    """タスクをプロセスプールで実行し、結果をグループの順に並べて返す
+
+    group_indices は各グループの元の番号（代表名選定の乱数の初期化に使う）
+    module_name はワーカーで関数を呼び出すモジュール名
+    """
+    results = [None] * len(member_lists)
+    if not member_lists:
+        return results
+
+    chunks = make_chunks(costs, workers)
+    initargs = (member_lists, group_indices, normalized_cache, weights, scorer_name, normalization_mode,
+                japanese_normalizer.STORE_SUFFIXES, module_name)
+
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+        futures = [executor.submit(task, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            for index, value in future.result():
+                results[index] = value
+            done += 1
+            clear_output(wait=True)
+            print(f"{label}（{workers}プロセス）: {done:,}/{len(chunks):,} タスク ({done*100//len(chunks)}%)")
+
+    return results
+
+
+def compute_representatives(member_lists, normalized_cache, workers, scorer_name='sequence_matcher',
+                            normalization_mode='basic', max_sample=50, weights=None, module_name='group_merchants'):
+    """全グループの代表名を並列に選定する
+
+    Args:
+        member_lists: グループごとのメンバーリスト
+        normalized_cache: 正規化済み文字列のキャッシュ {原文: 正規化文字列}
+        workers: プロセス数
+        scorer_name: 類似度スコアラー名
+        normalization_mode: 呼び出し元の NORMALIZATION_MODE
+        max_sample: select_best_representative のサンプル数の上限（コスト推定用）
+        weights: 各メンバーの重み {メンバー: 件数}（省略時は1）
+        module_name: select_best_representative を呼び出すモジュール名
+
+    Returns:
+        member_lists と同じ順の代表名リスト
+    """
+    results = [members[0] if members else "" for members in member_lists]
+    # 1件のグループは計算不要なので、複数メンバーのグループだけをワーカーに渡す
+    targets = [i for i, members in enumerate(member_lists) if len(members) > 1]
+    target_lists = [member_lists[i] for i in targets]
+    shared_cache = {m: normalized_cache[m] for members in target_lists for m in members if m in normalized_cache}
+    shared_weights = {m: weights[m] for members in target_lists for m in members if m in weights} if weights else None
+    costs = [min(len(members), max_sample) ** 2 for members in target_lists]
+
+    # 乱数は member_lists 内の元の番号で初期化するので、逐次実行と同じ代表名になる
+    reps = _run_parallel(_run_representatives, target_lists, costs, workers, "代表名再選定中",
+                         targets, shared_cache, shared_weights, scorer_name, normalization_mode, module_name)
+    for i, rep in zip(targets, reps):
+        results[i] = rep
+    return results
+
+
+def compute_keywords(member_lists, workers, normalization_mode='basic', module_name='group_merchants'):
+    """全グループのキーワードを並列に抽出する
+
+    module_name は extract_common_keyword_from_group を呼び出すモジュール名
+
+    Returns:
+        member_lists と同じ順のキーワードリスト
+    """
+    costs = [len(members) + max((len(m) for m in members), default=0) ** 2 for members in member_lists]
+    return _run_parallel(_run_keywords, member_lists, costs, workers, "キーワード抽出中",
+                         normalization_mode=normalization_mode, module_name=module_name)
+
+
+def check_serial_parallel(module_name, member_lists, workers=2):
+    """並列実行の結果が呼び出し元モジュールの逐次実行と一致するかを確認する
+
+    Returns:
+        一致しなかった項目のリスト [(種類, グループ番号, 逐次の結果, 並列の結果), ...]
+    """
+    module = importlib.import_module(module_name)
+    names = [m for members in member_lists for m in members]
+    normalized_cache = dict(zip(names, module.normalize_texts(names)))
+    scorer = get_scorer(module.SIMILARITY_SCORER)
+
+    serial_reps = [
+        module.select_best_representative(members, normalized_cache, scorer, rng=representative_rng(i))
+        if len(members) > 1 else members[0]
+        for i, members in enumerate(member_lists)
+    ]
+    serial_keywords = [module.extract_common_keyword_from_group(members) for members in member_lists]
+
+    parallel_reps = compute_representatives(member_lists, normalized_cache, workers, module.SIMILARITY_SCORER,
+                                            module.NORMALIZATION_MODE, module_name=module_name)
+    parallel_keywords = compute_keywords(member_lists, workers, module.NORMALIZATION_MODE, module_name=module_name)
+
+    mismatches = []
+    for kind, serial, parallel in (('代表名', serial_reps, parallel_reps),
+                                   ('キーワード', serial_keywords, parallel_keywords)):
+        for i, (expected, actual) in enumerate(zip(serial, parallel)):
+            if expected != actual:
+                mismatches.append((kind, i, expected, actual))
+    return mismatches
+
+
+def main():
+    """通常版・高速版それぞれで並列実行と逐次実行の結果が一致するかを確認する"""
+    rng = random.Random(0)
+    chains = ['セブン-イレブン', 'セブンイレブン', 'ファミリーマート', 'ローソン', 'スターバックス', 'Amazon', 'AMAZON']
+    branches = ['渋谷店', '新宿店', '品川駅前店', '梅田東口店', '']
+    member_lists = [["ABCDE", "abXYZ", "abcde"]]
+    for _ in range(200):
+        size = rng.randint(1, 30)
+        member_lists.append(sorted({rng.choice(chains) + rng.choice(branches) for _ in range(size)}))
+
+    for module_name in ('group_merchants', 'group_merchants_fast'):
+        mismatches = check_serial_parallel(module_name, member_lists)
+        clear_output(wait=True)
+        if mismatches:
+            print(f"{module_name}: 逐次実行と一致しない結果が {len(mismatches):,} 件あります")
+            for kind, i, expected, actual in mismatches[:10]:
+                print(f"  グループ {i} の{kind}: 逐次 {expected!r} / 並列 {actual!r}")
+        else:
+            print(f"{module_name}: 並列実行の結果は逐次実行と一致しました（{len(member_lists):,} グループ）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+import glob
+import heapq
+import io
+import math
+import random
+import time
+from contextlib import redirect_stdout
+
+import pandas as pd
+from IPython.display import clear_output
+
+# =============================================================================
+# 設定値（ここを変更するとプログラム全体に反映されます）
+# =============================================================================
+
+# プレビューするグルーピング方式
+# - 'fast': 前方一致（group_merchants_fast.py）。PREVIEW_PREFIX_LENGTHS を比較
+# - 'similarity': 類似度（group_merchants.py）。PREVIEW_THRESHOLDS を比較
+PREVIEW_ENGINE = 'fast'
+
+# サンプルする店名の数
+# - 類似度方式はサンプル数の2乗に比例して時間がかかるので 1000 程度までを目安にする
+PREVIEW_SAMPLE_SIZE = 1000
+
+# サンプリングの乱数シード（同じ値なら同じサンプルになる）
+PREVIEW_SEED = 0
+
+# 比較するパラメータ
+PREVIEW_PREFIX_LENGTHS = [2, 3, 4, 5, 6]
+PREVIEW_THRESHOLDS = [0.70, 0.75, 0.80, 0.85, 0.90]
+
+# 表示する大きいグループの数
+PREVIEW_TOP_GROUPS = 5
+
+# =============================================================================
+
+# 方式ごとの入力ファイル（各 main() と同じ）
+ENGINE_SOURCES = {
+    'fast': 'data/tran*.csv',
+    'similarity': 'data/monthly-individual-merchant-profile-vectors-v02-2x2/2*.csv',
+}
+
+
+class WeightedReservoir:
+    """出現回数で重み付けした店名のリザーバサンプル（重複なし）
+
+    各店名に key = log(u) / 重み（u は一様乱数）を割り当て、key の大きい
+    上位 size 件を残す（Efraimidis-Spirakis の A-Res）。同じ店名が複数ファイルに
+    現れた場合は key の最大値を採用する。max(log(u_i) / w_i) は log(u) / Σw_i と
+    同じ分布なので、出現回数の合計で1回だけ抽選した場合と同じサンプルになる。
+    """
+
+    def __init__(self, size, seed=PREVIEW_SEED):
+        self.size = size
+        self.rng = random.Random(seed)
+        self.keys = {}   # サンプル中の店名 → key
+        self.heap = []   # (key, 店名) の最小ヒープ（古い key のエントリを含む）
+
+    def _drop_stale(self):
+        while self.heap and self.keys.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    def add(self, name, weight):
+        if weight <= 0:
+            return
+        key = math.log(1.0 - self.rng.random()) / weight
+
+        current = self.keys.get(name)
+        if current is not None:
+            if key > current:
+                self.keys[name] = key
+                heapq.heappush(self.heap, (key, name))
+            return
+
+        if len(self.keys) < self.size:
+            self.keys[name] = key
+            heapq.heappush(self.heap, (key, name))
+            return
+
+        self._drop_stale()
+        if key > self.heap[0][0]:
+            _, evicted = heapq.heappop(self.heap)
+            del self.keys[evicted]
+            self.keys[name] = key
+            heapq.heappush(self.heap, (key, name))
+
+    def sample(self):
+        """サンプルした店名（昇順）"""
+        return sorted(self.keys)
+
+
+def extract_sample(csv_files, sample_size=PREVIEW_SAMPLE_SIZE, seed=PREVIEW_SEED):
+    """店名を抽出しながら出現回数で重み付けしたサンプルを作る
+
+    Returns:
+        {'sample': サンプル店名リスト, 'unique_count': 全ユニーク店名数, 'total_count': 全行数, 'seconds': 抽出時間}
+    """
+    start = time.perf_counter()
+    reservoir = WeightedReservoir(sample_size, seed)
+    unique_names = set()
+    total_count = 0
+
+    for i, csv_file in enumerate(csv_files):
+        if i > 0 and i % 10 == 0:
+            clear_output(wait=True)
+            print(f"ファイル読み込み中: {i}/{len(csv_files)}")
+        df = pd.read_csv(csv_file, encoding='utf-8-sig')
+        merchant_col = df.columns[5]
+        counts = df[merchant_col].dropna().value_counts()
+        for name, count in counts.items():
+            reservoir.add(name, count)
+        unique_names.update(counts.index)
+        total_count += int(counts.sum())
+
+    sample = reservoir.sample()
+    return {
+        'sample': sample,
+        'unique_count': len(unique_names),
+        'total_count': total_count,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def group_stats(groups, sample_size):
+    """サンプルのグルーピング結果から統計を求める
+
+    グループ数はサンプル内の値のみ返す（全件のグループ数へは拡大しない）。
+    サンプルは出現回数で重み付けしているため頻出の店名に偏っており、
+    また店名が増えるほど1グループあたりの店名数も変わるので、
+    group_ratio（グループ数 / サンプル店名数）を全件にそのまま掛けても推定にはならない。
+    """
+    sizes = sorted((len(members) for _, members in groups), reverse=True)
+    bins = [('1', 1, 1), ('2', 2, 2), ('3-5', 3, 5), ('6-10', 6, 10), ('11+', 11, None)]
+    distribution = {
+        label: sum(1 for s in sizes if s >= low and (high is None or s <= high))
+        for label, low, high in bins
+    }
+    largest = sorted(groups, key=lambda g: -len(g[1]))
+    return {
+        'group_count': len(groups),
+        'group_ratio': len(groups) / max(sample_size, 1),
+        'size_distribution': distribution,
+        'largest_groups': [(rep, len(members)) for rep, members in largest[:PREVIEW_TOP_GROUPS]],
+    }
+
+
+def preview_fast(sample, unique_count, prefix_lengths=PREVIEW_PREFIX_LENGTHS):
+    """前方一致方式をサンプルに対して各 PREFIX_LENGTH で実行する
+
+    全件の処理時間はグループ数にほぼ比例するので、サンプルでの時間を線形に拡大して推定する。
+    """
+    from group_merchants_fast import group_merchants_fast
+
+    results = []
+    for prefix_len in prefix_lengths:
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            groups = group_merchants_fast(sample, prefix_len)
+        seconds = time.perf_counter() - start
+
+        stats = group_stats(groups, len(sample))
+        stats['param'] = f"PREFIX_LENGTH={prefix_len}"
+        stats['predicted_seconds'] = seconds * unique_count / max(len(sample), 1)
+        results.append(stats)
+    return results
+
+
+def preview_similarity(sample, unique_count, thresholds=PREVIEW_THRESHOLDS):
+    """類似度方式（group_merchants.py）をサンプルに対して各閾値で実行する
+
+    通常版は各店名を既存グループ全件と比較するため、処理時間は
+    「店名数 × グループ数」に比例する。グループ数も店名数にほぼ比例するので、
+    サンプルでの時間を (ユニーク店名数 / サンプル数) の2乗で拡大して推定する。
+    """
+    from group_merchants import group_merchants
+
+    results = []
+    for threshold in thresholds:
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            groups = group_merchants(sample, threshold)
+        seconds = time.perf_counter() - start
+
+        stats = group_stats(groups, len(sample))
+        stats['param'] = f"SIMILARITY_THRESHOLD={threshold:.2f}"
+        stats['predicted_seconds'] = seconds * (unique_count / max(len(sample), 1)) ** 2
+        results.append(stats)
+    return results
+
+
+def format_seconds(seconds):
+    if seconds < 60:
+        return f"{seconds:.1f} 秒"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} 分"
+    return f"{seconds / 3600:.1f} 時間"
+
+
+def main():
+    csv_files = sorted(glob.glob(ENGINE_SOURCES[PREVIEW_ENGINE]))
+
+    print("=" * 60)
+    print(f"グルーピングのプレビュー（{PREVIEW_ENGINE}）")
+    print("=" * 60)
+    print(f"対象ファイル数: {len(csv_files)} 件")
+    print(f"サンプル数: {PREVIEW_SAMPLE_SIZE:,} 件（シード: {PREVIEW_SEED}）")
+    print()
+
+    extracted = extract_sample(csv_files, PREVIEW_SAMPLE_SIZE, PREVIEW_SEED)
+    sample = extracted['sample']
+    clear_output(wait=True)
+    print(f"ユニークな店名数: {extracted['unique_count']:,} 件（抽出 {format_seconds(extracted['seconds'])}）")
+    print(f"サンプル店名数: {len(sample):,} 件")
+    print()
+
+    if PREVIEW_ENGINE == 'fast':
+        results = preview_fast(sample, extracted['unique_count'], PREVIEW_PREFIX_LENGTHS)
+    else:
+        results = preview_similarity(sample, extracted['unique_count'], PREVIEW_THRESHOLDS)
+
+    print("=" * 60)
+    print("パラメータ別の結果（サンプル内の値）")
+    print("=" * 60)
+    print("※ サンプルは出現回数で重み付けしているため頻出の店名に偏っています。")
+    print("   グループ数の比率は店名数によって変わるので、全件のグループ数の推定には使えません。")
+    for stats in results:
+        distribution = ', '.join(f"{k}: {v:,}" for k, v in stats['size_distribution'].items())
+        print(f"\n【{stats['param']}】")
+        print(f"  サンプルのグループ数: {stats['group_count']:,}"
+              f"（サンプル店名数に対する比率: {stats['group_ratio']:.1%}、頻出店名に偏ったサンプルでの値）")
+        print(f"  グループサイズ分布（サンプル）: {distribution}")
+        print(f"  全件の推定処理時間: {format_seconds(stats['predicted_seconds'])}")
+        print("  大きいグループ:")
+        for rep, size in stats['largest_groups']:
+            print(f"    - {rep}（サンプル中 {size} 件）")
+
+
+# Jupyter Notebookで実行する場合は main() を呼び出してください
+# main()
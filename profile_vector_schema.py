@@ -0,0 +1,69 @@
+# =============================================================================
+# 月次マーチャントプロファイルベクトル（v02-2x2）のカラム定義
+# =============================================================================
+#
+# show_dataframe.py などの読み込みスクリプト・ベンチマークで共通に使う。
+
+# カラム名（ファイルの列順）
+column_names = [
+    'Period',
+    'Date',
+    'Merchant ID',
+    'Merchant Name',
+    '#Users',
+    'Value',
+    '#Trans.',
+    'Avg. Age',
+    'Std. Age',
+    '#Users by Gender (Male)',
+    '#Users by Gender (Female)',
+    '#Users by Gender (Unknown)',
+    '#Users by Card Type (Cash+Debit)',
+    '#Users by Card Type (Debit)',
+    '#Users by Web Registration (Registered)',
+    '#Users by Web Registration (Not Registered)',
+    '#Users by Payment Method Value Order (online,In-person,Unknown)',
+    '#Users by Payment Method Value Order (Online,Unknown,In-person)',
+    '#Users by Payment Method Value Order (In-person, Online,Unknown)',
+    '#Users by Payment Method Value Order (In-person,Unknown,Online)',
+    '#Users by Payment Method Value Order (Unknown,Online,In-person)',
+    '#Users by Payment Method Value Order (Unknown,In-person,Online)',
+    '#Users by Payment Method #Trans. Order (Online,In-person,Unknown)',
+    '#Users by Payment Method #Trans. Order (online,Unknown, In-person)',
+    '#Users by Payment Method #Trans. Order (In-person,Online,Unknown)',
+    '#Users by Payment Method #Trans. Order (In-person,Unknown,Online)',
+    '#Users by Payment Method #Trans. Order (Unknown,Online,In-person)',
+    '#Users by Payment Method #Trans. Order (Unknown, In-person,Online)',
+    'Value by Payment Method (Online)',
+    'Value by Payment Method (In-person)',
+    'Value by Payment Method (Unknown)',
+    '#Trans. by Payment Method (Online)',
+    '#Trans. by Payment Method (In-person)',
+    '#Trans. by Payment Method (Unknown)',
+    'Value / trans.',
+    'CDF VT(i)',
+    'CDF #Trans.(j)',
+    '2DR (2x2, VTxT) - VT(I)',
+    '2DR (2x2 VTxT) - #Trans.(j)',
+    '2DR Cell (2x2, VTxT)',
+    'Prev. CDF #Trans.(j)',
+    'Prev. CDF VT(i)',
+    'Prev. 2DR (2x2, VTxT) - #Trans. (j)',
+    'Prev. 2DR (2x2,  VTxT)- VT(i)',
+    'Prev. 2DR Cell (2x2,  VTxT)'
+]
+
+# 2DRセルの列（当月・前月）
+cell_columns = ['2DR Cell (2x2, VTxT)', 'Prev. 2DR Cell (2x2,  VTxT)']
+
+# 読み込み時の列の型（型推論を省略する）
+# - 2DRの区分・セルはカテゴリ、識別子と店名は文字列、それ以外の数値列は欠損を許す float64
+column_dtypes = {
+    col: 'category' if '2DR' in col else 'float64' for col in column_names
+}
+column_dtypes.update({
+    'Period': 'int32',
+    'Date': 'string',
+    'Merchant ID': 'string',
+    'Merchant Name': 'string',
+})
@@ -1,55 +1,125 @@
 import pandas as pd
 import glob
+import io
 import os
 
-# カラム名を明示的に指定
-column_names = [
-    'Period',
-    'Date',
-    'Merchant ID',
-    'Merchant Name',
-    '#Users',
-    'Value',
-    '#Trans.',
-    'Avg. Age',
-    'Std. Age',
-    '#Users by Gender (Male)',
-    '#Users by Gender (Female)',
-    '#Users by Gender (Unknown)',
-    '#Users by Card Type (Cash+Debit)',
-    '#Users by Card Type (Debit)',
-    '#Users by Web Registration (Registered)',
-    '#Users by Web Registration (Not Registered)',
-    '#Users by Payment Method Value Order (online,In-person,Unknown)',
-    '#Users by Payment Method Value Order (Online,Unknown,In-person)',
-    '#Users by Payment Method Value Order (In-person, Online,Unknown)',
-    '#Users by Payment Method Value Order (In-person,Unknown,Online)',
-    '#Users by Payment Method Value Order (Unknown,Online,In-person)',
-    '#Users by Payment Method Value Order (Unknown,In-person,Online)',
-    '#Users by Payment Method #Trans. Order (Online,In-person,Unknown)',
-    '#Users by Payment Method #Trans. Order (online,Unknown, In-person)',
-    '#Users by Payment Method #Trans. Order (In-person,Online,Unknown)',
-    '#Users by Payment Method #Trans. Order (In-person,Unknown,Online)',
-    '#Users by Payment Method #Trans. Order (Unknown,Online,In-person)',
-    '#Users by Payment Method #Trans. Order (Unknown, In-person,Online)',
-    'Value by Payment Method (Online)',
-    'Value by Payment Method (In-person)',
-    'Value by Payment Method (Unknown)',
-    '#Trans. by Payment Method (Online)',
-    '#Trans. by Payment Method (In-person)',
-    '#Trans. by Payment Method (Unknown)',
-    'Value / trans.',
-    'CDF VT(i)',
-    'CDF #Trans.(j)',
-    '2DR (2x2, VTxT) - VT(I)',
-    '2DR (2x2 VTxT) - #Trans.(j)',
-    '2DR Cell (2x2, VTxT)',
-    'Prev. CDF #Trans.(j)',
-    'Prev. CDF VT(i)',
-    'Prev. 2DR (2x2, VTxT) - #Trans. (j)',
-    'Prev. 2DR (2x2,  VTxT)- VT(i)',
-    'Prev. 2DR Cell (2x2,  VTxT)'
-]
+# カラム名を明示的に指定（profile_vector_schema.py で一元管理）
+from profile_vector_schema import column_names
+
+# =============================================================================
+# 設定値（ここを変更するとプログラム全体に反映されます）
+# =============================================================================
+
+# プレビューモード
+# - False: 全ファイルを結合して df_all を作る（既定）
+# - True: 先頭・末尾の行だけを読む（全件を結合しないので高速・省メモリ。df_all は作らない）
+PREVIEW_MODE = False
+
+# 先頭・末尾に表示する行数
+PREVIEW_ROWS = 10
+
+# 末尾を探すときにファイルの後ろから一度に読むバイト数
+TAIL_BLOCK_SIZE = 64 * 1024
+
+# =============================================================================
+
+
+def count_rows(path, block_size=1024 * 1024):
+    """改行のバイト数を数えてデータ行数を求める（ヘッダー行を除く）
+
+    ※ 店名などに改行を含むクォート付きの値がある場合は、その分だけ多く数える
+    """
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+    # 最終行に改行がない場合も1行として数える
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def read_head(path, n):
+    """ファイルの先頭 n 行を読む"""
+    return pd.read_csv(path, encoding='utf-8-sig', header=0, names=column_names, nrows=n)
+
+
+def read_tail(path, n, block_size=TAIL_BLOCK_SIZE):
+    """ファイルの末尾から後ろ向きにシークして、最後の n 行だけを読む"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        # 途中から読み始めた最初の行は欠けているので、n 行 + 1 行分の改行が見つかるまで読み足す
+        while position > 0 and data.rstrip(b'\r\n').count(b'\n') <= n:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+
+    if position > 0:
+        # 欠けている先頭の行を捨てる
+        data = data[data.index(b'\n') + 1:]
+        header = None
+    else:
+        # ファイル全体を読んだ場合はヘッダー行を飛ばす
+        header = 0
+
+    lines = data.rstrip(b'\r\n').split(b'\n')
+    if header == 0:
+        lines = lines[1:]
+    tail = b'\n'.join(lines[-n:]) if n > 0 else b''
+    if not tail:
+        return pd.DataFrame(columns=column_names)
+    return pd.read_csv(io.BytesIO(tail), encoding='utf-8-sig', header=None, names=column_names)
+
+
+def read_head_rows(paths, n):
+    """先頭のファイルから順に、合計 n 行になるまで先頭行を読む"""
+    dfs = []
+    remaining = n
+    for path in paths:
+        if remaining <= 0:
+            break
+        df = read_head(path, remaining)
+        dfs.append(df)
+        remaining -= len(df)
+    if not dfs:
+        return pd.DataFrame(columns=column_names)
+    return pd.concat(dfs, ignore_index=True)
+
+
+def read_tail_rows(paths, n):
+    """末尾のファイルから逆順に、合計 n 行になるまで末尾行を読む"""
+    dfs = []
+    remaining = n
+    for path in reversed(paths):
+        if remaining <= 0:
+            break
+        df = read_tail(path, remaining)
+        dfs.append(df)
+        remaining -= len(df)
+    if not dfs:
+        return pd.DataFrame(columns=column_names)
+    return pd.concat(dfs[::-1], ignore_index=True)
+
+
+def period_range(paths):
+    """各ファイルの先頭行と末尾行から Period の最小値・最大値を求める"""
+    periods = []
+    for path in paths:
+        periods.extend(read_head(path, 1)['Period'].tolist())
+        periods.extend(read_tail(path, 1)['Period'].tolist())
+    periods = [p for p in periods if pd.notna(p)]
+    if not periods:
+        return None, None
+    return min(periods), max(periods)
+
 
 # 複数CSVファイルを読み込む（24277〜24300）
 csv_files = sorted(glob.glob('data/monthly-individual-merchant-profile-vectors-v02-2x2/2*.csv'))
@@ -59,18 +129,32 @@ for f in csv_files:
     print(f"  - {os.path.basename(f)}")
 print()
 
-# 全ファイルを結合
-dfs = []
-for csv_file in csv_files:
-    df = pd.read_csv(csv_file, encoding='utf-8-sig', header=0, names=column_names)
-    dfs.append(df)
+if PREVIEW_MODE:
+    # 先頭・末尾の行だけを読む（行数が足りないファイルは前後のファイルから補う）
+    row_count = sum(count_rows(csv_file) for csv_file in csv_files)
+    period_min, period_max = period_range(csv_files)
+    df_head = read_head_rows(csv_files, PREVIEW_ROWS)
+    df_tail = read_tail_rows(csv_files, PREVIEW_ROWS)
+    # 全件を結合した場合と同じ通し番号にする
+    df_tail.index = range(row_count - len(df_tail), row_count)
+    column_count = len(column_names)
+else:
+    # 全ファイルを結合
+    dfs = []
+    for csv_file in csv_files:
+        df = pd.read_csv(csv_file, encoding='utf-8-sig', header=0, names=column_names)
+        dfs.append(df)
 
-df_all = pd.concat(dfs, ignore_index=True)
+    df_all = pd.concat(dfs, ignore_index=True)
+    row_count, column_count = df_all.shape
+    period_min, period_max = df_all['Period'].min(), df_all['Period'].max()
+    df_head = df_all.head(PREVIEW_ROWS)
+    df_tail = df_all.tail(PREVIEW_ROWS)
 
 # データフレームの基本情報を表示
 print("=== データフレームの形状 ===")
-print(f"行数: {df_all.shape[0]}, 列数: {df_all.shape[1]}")
-print(f"Period範囲: {df_all['Period'].min()} 〜 {df_all['Period'].max()}")
+print(f"行数: {row_count}, 列数: {column_count}")
+print(f"Period範囲: {period_min} 〜 {period_max}")
 print()
 
 print("=== カラム名一覧 ===")
@@ -78,11 +162,11 @@ for i, col in enumerate(column_names):
     print(f"{i+1}. {col}")
 print()
 
-print("=== データフレームの内容（先頭10行） ===")
+print(f"=== データフレームの内容（先頭{PREVIEW_ROWS}行） ===")
 pd.set_option('display.max_columns', None)
 pd.set_option('display.width', None)
-print(df_all.head(10))
+print(df_head)
 print()
 
-print("=== データフレームの内容（末尾10行） ===")
-print(df_all.tail(10))
+print(f"=== データフレームの内容（末尾{PREVIEW_ROWS}行） ===")
+print(df_tail)
@@ -0,0 +1,285 @@
+import os
+import numpy as np
+from collections import Counter
+from IPython.display import clear_output
+
+from group_merchants import normalize_text, select_best_representative, SIMILARITY_SCORER
+from similarity_scorer import get_scorer
+
+# =============================================================================
+# 設定値（ここを変更するとプログラム全体に反映されます）
+# =============================================================================
+
+# エッジとして保存する類似度の下限（0.0〜1.0）
+# - この値未満の店名ペアは保存しない（スイープできる閾値の下限になる）
+# - 低くするとスイープ範囲が広がるが、エッジ数と計算時間が増える
+SIMILARITY_FLOOR = 0.7
+
+# スイープする閾値の一覧
+SWEEP_THRESHOLDS = [0.70, 0.75, 0.80, 0.85, 0.90, 0.95]
+
+# デンドログラムの保存先
+DENDROGRAM_PATH = 'output/similarity_dendrogram.npz'
+
+# =============================================================================
+
+
+def build_similarity_edges(normalized_names, floor=SIMILARITY_FLOOR, scorer=None):
+    """下限以上の類似度を持つ店名ペア（エッジ）を一度だけ計算する
+
+    各店名をそれより前の店名全件とスコアラーで一括計算し、長さの比による
+    上限が下限未満のペアは結果から除く。前の店名のリストは末尾に追加していくだけなので、
+    スコアラーは符号化済みの候補を使い回せる（bitparallel_lcs）。
+
+    Args:
+        normalized_names: 正規化済み店名リスト（空文字を含まないこと）
+        floor: 保存する類似度の下限
+        scorer: 類似度スコアラー（省略時は SIMILARITY_SCORER）
+
+    Returns:
+        (src, dst, score) の numpy 配列（score の降順）
+    """
+    if scorer is None:
+        scorer = get_scorer(SIMILARITY_SCORER)
+
+    total = len(normalized_names)
+    src, dst, score = [], [], []
+    lengths = np.fromiter((len(s) for s in normalized_names), dtype=np.float64, count=total)
+    previous = list(normalized_names[:1])
+
+    for j in range(1, total):
+        if j % 1000 == 0:
+            clear_output(wait=True)
+            print(f"エッジ計算中: {j:,}/{total:,} ({j*100//total}%) - エッジ数: {len(score):,}")
+
+        similarities = np.asarray(scorer.one_vs_many(normalized_names[j], previous, floor), dtype=np.float64)
+        previous.append(normalized_names[j])
+
+        # 長さの比から求まる類似度の上限で足切り
+        # （sequence_matcher は real_quick_ratio で同じ足切りを計算前に行っている）
+        len_j = lengths[j]
+        upper_bounds = 2.0 * np.minimum(lengths[:j], len_j) / (lengths[:j] + len_j)
+        hits = np.flatnonzero((similarities >= floor) & (upper_bounds >= floor))
+        src.extend(hits.tolist())
+        dst.extend([j] * len(hits))
+        score.extend(similarities[hits].tolist())
+
+    src = np.asarray(src, dtype=np.int32)
+    dst = np.asarray(dst, dtype=np.int32)
+    score = np.asarray(score, dtype=np.float64)
+
+    # 類似度の降順（同点はインデックス順）に並べて結果を入力順に依存させない
+    order = np.lexsort((dst, src, -score))
+    return src[order], dst[order], score[order]
+
+
+def _find(parent, x):
+    """Union-Find の根を求める（経路半分化）"""
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def build_dendrogram(merchant_names, floor=SIMILARITY_FLOOR):
+    """店名の単連結（single-linkage）デンドログラムを作成する
+
+    エッジを類似度の降順に Union-Find で結合し、実際に結合が起きたエッジ
+    （最大全域森の辺）だけを記録する。任意の閾値でのグルーピングは
+    この結合列を先頭から閾値まで再生するだけで求まる。
+
+    Args:
+        merchant_names: 店名リスト
+        floor: 保存する類似度の下限
+
+    Returns:
+        {'names', 'normalized', 'merge_a', 'merge_b', 'merge_score', 'floor'} の辞書
+    """
+    # 正規化後が空の店名は通常版と同様に対象外
+    names = []
+    normalized = []
+    for name in merchant_names:
+        norm = normalize_text(name)
+        if norm:
+            names.append(name)
+            normalized.append(norm)
+
+    src, dst, score = build_similarity_edges(normalized, floor)
+
+    parent = list(range(len(names)))
+    merge_a, merge_b, merge_score = [], [], []
+    for a, b, s in zip(src.tolist(), dst.tolist(), score.tolist()):
+        root_a = _find(parent, a)
+        root_b = _find(parent, b)
+        if root_a == root_b:
+            continue
+        parent[root_b] = root_a
+        merge_a.append(a)
+        merge_b.append(b)
+        merge_score.append(s)
+
+    clear_output(wait=True)
+    print(f"デンドログラム作成完了: 店名 {len(names):,} 件 - エッジ {len(score):,} 件 - 結合 {len(merge_score):,} 件")
+
+    return {
+        'names': names,
+        'normalized': normalized,
+        'merge_a': np.asarray(merge_a, dtype=np.int32),
+        'merge_b': np.asarray(merge_b, dtype=np.int32),
+        'merge_score': np.asarray(merge_score, dtype=np.float64),
+        'floor': floor,
+    }
+
+
+def save_dendrogram(dendrogram, output_path=DENDROGRAM_PATH):
+    """デンドログラムを npz ファイルに保存する"""
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    np.savez_compressed(
+        output_path,
+        names=np.asarray(dendrogram['names'], dtype=str),
+        normalized=np.asarray(dendrogram['normalized'], dtype=str),
+        merge_a=dendrogram['merge_a'],
+        merge_b=dendrogram['merge_b'],
+        merge_score=dendrogram['merge_score'],
+        floor=np.float64(dendrogram['floor']),
+    )
+    return output_path
+
+
+def load_dendrogram(path=DENDROGRAM_PATH):
+    """save_dendrogram で保存したデンドログラムを読み込む"""
+    with np.load(path) as data:
+        return {
+            'names': data['names'].tolist(),
+            'normalized': data['normalized'].tolist(),
+            'merge_a': data['merge_a'],
+            'merge_b': data['merge_b'],
+            'merge_score': data['merge_score'],
+            'floor': float(data['floor']),
+        }
+
+
+def labels_at_threshold(dendrogram, threshold):
+    """指定した閾値での各店名のグループ番号を求める（O(n)）
+
+    グループ番号は各グループで最初に現れる店名の順に 0 から振る。
+    """
+    if threshold < dendrogram['floor']:
+        raise ValueError(f"閾値 {threshold} は保存時の下限 {dendrogram['floor']} より小さいため求められません")
+
+    total = len(dendrogram['names'])
+    parent = list(range(total))
+
+    # 結合列は類似度の降順なので、閾値を下回った時点で打ち切れる
+    count = int(np.searchsorted(-dendrogram['merge_score'], -threshold, side='right'))
+    for a, b in zip(dendrogram['merge_a'][:count].tolist(), dendrogram['merge_b'][:count].tolist()):
+        root_a = _find(parent, a)
+        root_b = _find(parent, b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    labels = np.empty(total, dtype=np.int32)
+    label_of_root = {}
+    for i in range(total):
+        root = _find(parent, i)
+        if root not in label_of_root:
+            label_of_root[root] = len(label_of_root)
+        labels[i] = label_of_root[root]
+    return labels
+
+
+def groups_at_threshold(dendrogram, threshold, select_representative=True):
+    """指定した閾値でのグルーピング結果を group_merchants と同じ形式で返す
+
+    Returns:
+        [(代表名, [メンバーリスト]), ...]
+    """
+    labels = labels_at_threshold(dendrogram, threshold)
+    names = dendrogram['names']
+    members_by_label = [[] for _ in range(int(labels.max()) + 1 if len(labels) else 0)]
+    for name, label in zip(names, labels.tolist()):
+        members_by_label[label].append(name)
+
+    normalized_cache = dict(zip(names, dendrogram['normalized']))
+    result = []
+    for members in members_by_label:
+        if select_representative and len(members) > 1:
+            rep = select_best_representative(members, normalized_cache)
+        else:
+            rep = members[0]
+        result.append((rep, members))
+    return result
+
+
+def threshold_stats(dendrogram, threshold):
+    """指定した閾値でのグループ数・サイズ分布などの統計を返す"""
+    labels = labels_at_threshold(dendrogram, threshold)
+    sizes = np.bincount(labels) if len(labels) else np.zeros(0, dtype=np.int64)
+
+    # サイズ分布（1, 2, 3-5, 6-10, 11-50, 51以上）
+    bins = [1, 2, 3, 6, 11, 51]
+    labels_bin = ['1', '2', '3-5', '6-10', '11-50', '51+']
+    bin_index = np.searchsorted(bins, sizes, side='right') - 1
+    distribution = dict(zip(labels_bin, np.bincount(bin_index, minlength=len(bins)).tolist()))
+
+    largest = int(sizes.argmax()) if len(sizes) else -1
+    largest_name = dendrogram['names'][int(np.argmax(labels == largest))] if largest >= 0 else ""
+
+    return {
+        'threshold': threshold,
+        'group_count': int(len(sizes)),
+        'multi_member_count': int((sizes > 1).sum()),
+        'max_size': int(sizes.max()) if len(sizes) else 0,
+        'largest_group_example': largest_name,
+        'size_distribution': distribution,
+    }
+
+
+def sweep_thresholds(dendrogram, thresholds=SWEEP_THRESHOLDS):
+    """複数の閾値について統計を一括で求める"""
+    return [threshold_stats(dendrogram, t) for t in thresholds if t >= dendrogram['floor']]
+
+
+def main():
+    import glob
+    import pandas as pd
+
+    # CSVファイルを取得
+    csv_dir = 'data/monthly-individual-merchant-profile-vectors-v02-2x2'
+    csv_files = sorted(glob.glob(f'{csv_dir}/2*.csv'))
+
+    print("=" * 60)
+    print("類似度閾値スイープ（単連結デンドログラム）")
+    print("=" * 60)
+    print(f"対象ファイル数: {len(csv_files)} 件")
+    print(f"類似度の下限: {SIMILARITY_FLOOR * 100:.0f}%")
+    print()
+
+    merchant_counts = Counter()
+    for csv_file in csv_files:
+        df = pd.read_csv(csv_file, encoding='utf-8-sig')
+        merchant_col = df.columns[5]
+        merchant_counts.update(df[merchant_col].dropna())
+
+    merchant_list = sorted(merchant_counts.keys())
+    print(f"ユニークな店名数: {len(merchant_list):,} 件")
+    print()
+
+    dendrogram = build_dendrogram(merchant_list, SIMILARITY_FLOOR)
+    output_path = save_dendrogram(dendrogram, DENDROGRAM_PATH)
+    print(f"デンドログラム保存先: {output_path}")
+    print()
+
+    print("=" * 60)
+    print("閾値ごとのグルーピング結果")
+    print("=" * 60)
+    for stats in sweep_thresholds(dendrogram, SWEEP_THRESHOLDS):
+        distribution = ', '.join(f"{k}: {v:,}" for k, v in stats['size_distribution'].items())
+        print(f"閾値 {stats['threshold'] * 100:.0f}%: グループ数 {stats['group_count']:,}"
+              f"（うち複数メンバー: {stats['multi_member_count']:,}）"
+              f" 最大サイズ {stats['max_size']:,}（例: {stats['largest_group_example']}）")
+        print(f"  サイズ分布: {distribution}")
+
+
+# Jupyter Notebookで実行する場合は main() を呼び出してください
+# main()
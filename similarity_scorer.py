@@ -0,0 +1,191 @@
+from difflib import SequenceMatcher
+
+# =============================================================================
+# 類似度スコアラー
+# =============================================================================
+#
+# group_merchants / select_best_representative から使う一括類似度計算。
+# すべてのスコアラーは以下のメソッドを持つ：
+#
+#   one_vs_many(query, candidates, threshold=0.0)
+#       query と各 candidate の類似度リストを返す
+#   many_vs_many(queries, candidates)
+#       scores[i][j] = query i と candidate j の類似度 の二重リストを返す
+#
+# threshold を指定した場合、threshold 未満と判定できたペアは 0.0 を返す
+# （閾値以上のスコアは常に正確な値を返す）。
+
+# ビット並列LCSで1語として扱えるクエリの最大長
+BITPARALLEL_MAX_LENGTH = 64
+
+
+class SequenceMatcherScorer:
+    """difflib.SequenceMatcher による類似度（calc_similarity と完全に同じ値）
+
+    candidate 側を seq2 として SequenceMatcher をキャッシュし、b2j インデックスを
+    使い回す。threshold 指定時は real_quick_ratio / quick_ratio で足切りする。
+    """
+
+    def __init__(self, max_cache_size=100000):
+        self.max_cache_size = max_cache_size
+        self._matchers = {}
+
+    def _matcher(self, candidate):
+        matcher = self._matchers.get(candidate)
+        if matcher is None:
+            if len(self._matchers) >= self.max_cache_size:
+                self._matchers.clear()
+            matcher = SequenceMatcher(None)
+            matcher.set_seq2(candidate)
+            self._matchers[candidate] = matcher
+        return matcher
+
+    def one_vs_many(self, query, candidates, threshold=0.0):
+        scores = []
+        for candidate in candidates:
+            matcher = self._matcher(candidate)
+            matcher.set_seq1(query)
+            if threshold > 0 and (matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold):
+                scores.append(0.0)
+            else:
+                scores.append(matcher.ratio())
+        return scores
+
+    def many_vs_many(self, queries, candidates):
+        # candidate ごとに seq2 を固定し、列単位で計算する
+        scores = [[0.0] * len(candidates) for _ in queries]
+        for j, candidate in enumerate(candidates):
+            matcher = SequenceMatcher(None)
+            matcher.set_seq2(candidate)
+            for i, query in enumerate(queries):
+                matcher.set_seq1(query)
+                scores[i][j] = matcher.ratio()
+        return scores
+
+    def clear(self):
+        self._matchers.clear()
+
+
+class BitParallelLCSScorer:
+    """NumPy によるビット並列LCSの類似度（2 * LCS長 / 両文字列の長さの合計）
+
+    query の各文字の出現位置を 64bit マスクにし、全 candidate を1列ずつ
+    同時に処理する（Hyyrö のビット並列LCS）。SequenceMatcher.ratio() 以上の値
+    （LCS ≧ 一致ブロック合計）になるため、同じ閾値ではグループがやや大きくなる。
+    query が BITPARALLEL_MAX_LENGTH 文字を超える場合は SequenceMatcher で計算する。
+
+    candidate 側は文字番号の2次元配列として保持し、前回と同じリストに末尾から
+    追加されただけの場合（group_merchants の代表名リストなど）は追加分だけを符号化する。
+    """
+
+    def __init__(self):
+        import numpy as np
+        self._np = np
+        self._fallback = SequenceMatcherScorer()
+        self._alphabet = {}  # 文字 → 文字番号（0 は埋め草）
+        self._reset_candidates(None, 0)
+
+    def _reset_candidates(self, source, rows):
+        np = self._np
+        self._source = source
+        self._count = 0
+        self._last = None
+        self._codes = np.zeros((max(rows, 16), 1), dtype=np.int32)
+        self._lengths = np.zeros(self._codes.shape[0], dtype=np.int64)
+
+    def _encode_candidates(self, candidates):
+        """candidate の文字番号行列と長さ配列を返す（符号化済みの分は使い回す）"""
+        np = self._np
+        count = self._count
+        if (candidates is not self._source or len(candidates) < count
+                or (count and candidates[count - 1] != self._last)):
+            self._reset_candidates(candidates, len(candidates))
+            count = 0
+
+        new = candidates[count:]
+        if new:
+            needed = count + len(new)
+            rows, width = self._codes.shape
+            max_len = max(max(len(c) for c in new), 1)
+            if needed > rows or max_len > width:
+                # 行は倍々に、列は最長の candidate に合わせて広げる
+                grown = np.zeros((max(needed, rows * 2) if needed > rows else rows, max(width, max_len)),
+                                 dtype=np.int32)
+                grown[:count, :width] = self._codes[:count]
+                lengths = np.zeros(grown.shape[0], dtype=np.int64)
+                lengths[:count] = self._lengths[:count]
+                self._codes, self._lengths = grown, lengths
+
+            alphabet = self._alphabet
+            for i, candidate in enumerate(new, count):
+                self._codes[i, :len(candidate)] = [
+                    alphabet.setdefault(ch, len(alphabet) + 1) for ch in candidate
+                ]
+                self._lengths[i] = len(candidate)
+            self._count = needed
+            self._last = candidates[needed - 1]
+
+        return self._codes[:self._count], self._lengths[:self._count]
+
+    def _lcs_lengths(self, query, codes):
+        np = self._np
+        m = len(query)
+        if len(codes) == 0 or m == 0:
+            return np.zeros(len(codes), dtype=np.int64)
+
+        # 文字番号 → query 内の出現位置マスク の表（candidate に現れない文字は不要）
+        table = np.zeros(len(self._alphabet) + 1, dtype=np.uint64)
+        for pos, ch in enumerate(query):
+            code = self._alphabet.get(ch)
+            if code is not None:
+                table[code] |= np.uint64(1 << pos)
+
+        v = np.full(len(codes), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for column in range(codes.shape[1]):
+            u = v & table[codes[:, column]]
+            v = (v + u) | (v - u)
+
+        # 下位 m ビットのうち 0 のビット数が LCS 長
+        low_mask = np.uint64((1 << m) - 1)
+        ones = np.unpackbits((v & low_mask).view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        return m - ones.astype(np.int64)
+
+    def one_vs_many(self, query, candidates, threshold=0.0):
+        if len(query) > BITPARALLEL_MAX_LENGTH:
+            return self._fallback.one_vs_many(query, candidates, threshold)
+        np = self._np
+        if not isinstance(candidates, list):
+            candidates = list(candidates)
+        codes, lengths = self._encode_candidates(candidates)
+        lcs = self._lcs_lengths(query, codes)
+        totals = len(query) + lengths
+        scores = np.where(totals > 0, 2.0 * lcs / np.maximum(totals, 1), 0.0)
+        if threshold > 0:
+            scores = np.where(scores >= threshold, scores, 0.0)
+        return scores.tolist()
+
+    def many_vs_many(self, queries, candidates):
+        candidates = list(candidates)
+        return [self.one_vs_many(query, candidates) for query in queries]
+
+    def clear(self):
+        self._fallback.clear()
+        self._reset_candidates(None, 0)
+
+
+SCORERS = {
+    'sequence_matcher': SequenceMatcherScorer,
+    'bitparallel_lcs': BitParallelLCSScorer,
+}
+
+
+def get_scorer(name='sequence_matcher'):
+    """名前からスコアラーを作成する
+
+    Args:
+        name: 'sequence_matcher'（calc_similarity と同じ値）
+              または 'bitparallel_lcs'（高速・近似）
+    """
+    if name not in SCORERS:
+        raise ValueError(f"未対応のスコアラーです: {name}（{', '.join(SCORERS)} から選択）")
+    return SCORERS[name]()